@@ -0,0 +1,44 @@
+"""基准测试共用的配置生成"""
+
+from pathlib import Path
+
+CONFIG_TEMPLATE = """
+[aliyun.email]
+smtp_host = "127.0.0.1"
+smtp_port = {smtp_port}
+smtp_username = ""
+smtp_password = ""
+smtp_from = "bench@zsim.com.cn"
+send_real_email = {send_real_email}
+smtp_ssl = false
+
+[database]
+auth_db_path = "{tmp}/auth.db"
+vote_db_path = "{tmp}/vote.db"
+cache_db_path = "{tmp}/cache.db"
+
+[vote]
+character_snapshot_path = "{tmp}/character.parquet"
+
+[github]
+manifest_path = "{tmp}/releases.json"
+
+[rate_limit.send_code]
+total = {{ capacity = 1000000, period = 1 }}
+per_ip = {{ capacity = 1000000, period = 1 }}
+per_email = {{ capacity = 1000000, period = 1 }}
+"""
+
+
+def write_config(tmp: str, smtp_port: int = 465, send_real_email: bool = False) -> str:
+    """在临时目录中生成配置文件并返回其路径；限流放宽到不影响吞吐测量"""
+    path = Path(tmp) / "config.toml"
+    path.write_text(
+        CONFIG_TEMPLATE.format(
+            tmp=Path(tmp).as_posix(),
+            smtp_port=smtp_port,
+            send_real_email=str(send_real_email).lower(),
+        ),
+        encoding="utf-8",
+    )
+    return str(path)
@@ -0,0 +1,217 @@
+"""
+API 吞吐与延迟基准测试。
+
+在进程内启动 FastAPI 应用，按接近真实的比例混合请求各个接口，统计每个路由的吞吐量和
+p50 / p95 / p99 延迟。GitHub 和 SMTP 由本地替身代替，SQLite 数据库放在临时目录。
+
+两种模式：
+    asgi     通过 httpx.ASGITransport 直接调用应用，不经过网络栈
+    uvicorn  在本地端口启动 uvicorn，通过真实的 TCP 连接发送请求
+
+注意压测客户端与服务端运行在同一个事件循环中，结果适合做回归对比，
+绝对数值会低于独立部署时的表现。
+
+用法（在项目根目录下）：
+    uv run python -m backend.bench.load --mode asgi --duration 10 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import httpx
+
+from . import stubs
+from .common import write_config
+
+# 每种请求的权重，参考线上流量：投票页轮询占绝大多数
+DEFAULT_MIX = {
+    "characters": 50,
+    "characters_etag": 20,
+    "vote": 12,
+    "latest_release": 10,
+    "login": 4,
+    "send_code": 4,
+}
+
+
+@dataclass
+class RouteStats:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=lambda: defaultdict(int))
+    errors: int = 0
+
+    def percentile(self, q: float) -> float:
+        ordered = sorted(self.latencies)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class BenchUser:
+    username: str
+    password: str
+    token: str = ""
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, users: list[BenchUser], character_ids: list[int]):
+        self.client = client
+        self.users = users
+        self.character_ids = character_ids
+        self.characters_etag = ""
+        self.sent_codes = 0
+        self.stats: dict[str, RouteStats] = defaultdict(RouteStats)
+
+    async def request(self, kind: str):
+        user = random.choice(self.users)
+        if kind == "characters":
+            coro = self.client.get("/api/vote/characters")
+        elif kind == "characters_etag":
+            coro = self.client.get("/api/vote/characters", headers={"If-None-Match": self.characters_etag})
+        elif kind == "vote":
+            coro = self.client.post(
+                f"/api/vote/character/{random.choice(self.character_ids)}",
+                headers={"Authorization": f"Bearer {user.token}"},
+            )
+        elif kind == "latest_release":
+            coro = self.client.get("/api/github/latest-release")
+        elif kind == "login":
+            coro = self.client.post("/api/login", data={"username": user.username, "password": user.password})
+        elif kind == "send_code":
+            self.sent_codes += 1
+            coro = self.client.post(
+                "/api/send-code",
+                json={"email": f"bench-new-{self.sent_codes}@example.com", "purpose": "register"},
+            )
+        else:
+            raise ValueError(kind)
+
+        stats = self.stats[kind]
+        start = time.perf_counter()
+        try:
+            response = await coro
+        except httpx.HTTPError:
+            stats.errors += 1
+            return
+        stats.latencies.append(time.perf_counter() - start)
+        stats.statuses[response.status_code] += 1
+        if kind == "characters" and response.status_code == 200:
+            self.characters_etag = response.headers.get("ETag", "")
+
+    async def run(self, duration: float, concurrency: int, mix: dict[str, int]):
+        kinds = list(mix)
+        weights = [mix[kind] for kind in kinds]
+        deadline = time.perf_counter() + duration
+
+        async def client_loop():
+            while time.perf_counter() < deadline:
+                await self.request(random.choices(kinds, weights)[0])
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+
+async def prepare_users(count: int) -> list[BenchUser]:
+    """直接写数据库创建测试用户，避免走验证码流程"""
+    from ..src.auth import db, hash_password
+
+    users = [BenchUser(f"bench{i}", f"bench-password-{i}") for i in range(count)]
+    password_hashes = [await hash_password(user.password) for user in users]
+    async with db.transaction() as tx:
+        for i, (user, password_hash) in enumerate(zip(users, password_hashes)):
+            await tx.create_user(user.username, password_hash, f"bench{i}@example.com")
+    return users
+
+
+async def login_all(client: httpx.AsyncClient, users: list[BenchUser]):
+    for user in users:
+        response = await client.post("/api/login", data={"username": user.username, "password": user.password})
+        response.raise_for_status()
+        user.token = response.json()["access_token"]
+
+
+def report(workload: Workload, elapsed: float):
+    total = sum(len(s.latencies) + s.errors for s in workload.stats.values())
+    print(f"\n{total} requests in {elapsed:.1f}s, {total / elapsed:.0f} req/s overall")
+    print(f"{'route':<16}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  statuses")
+    for kind, stats in sorted(workload.stats.items()):
+        count = len(stats.latencies)
+        statuses = ", ".join(f"{code}:{n}" for code, n in sorted(stats.statuses.items()))
+        print(
+            f"{kind:<16}{count / elapsed:>9.0f}"
+            f"{stats.percentile(0.50) * 1000:>9.1f}{stats.percentile(0.95) * 1000:>9.1f}"
+            f"{stats.percentile(0.99) * 1000:>9.1f}{stats.errors:>8}  {statuses}"
+        )
+
+
+async def main(args):
+    github_port = stubs.free_port()
+    smtp_port = stubs.free_port()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["ZSIM_CONFIG"] = write_config(tmp, smtp_port=smtp_port, send_real_email=True)
+
+        # 导入应用前配置好环境变量，再把外部地址指向本地替身
+        from ..src import app, character_details
+        from ..src.github import release_api, release_manifest
+
+        github_base = f"http://127.0.0.1:{github_port}"
+        release_api.API_URL = f"{github_base}/repos/{release_api.REPO_OWNER}/{release_api.REPO_NAME}/releases/latest"
+        release_manifest.RELEASES_URL = f"{github_base}/repos/{release_api.REPO_OWNER}/{release_api.REPO_NAME}/releases"
+        character_details.CSV_URL = f"{github_base}/character.csv"
+        github_stub = stubs.create_github_stub()
+
+        github_server = await stubs.serve(github_stub, github_port)
+        smtp_server = await stubs.start_smtp_sink(smtp_port)
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+        try:
+            if args.mode == "asgi":
+                async with app.router.lifespan_context(app):
+                    transport = httpx.ASGITransport(app=app)
+                    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+                        await run_workload(client, args)
+            else:
+                app_port = stubs.free_port()
+                app_server = await stubs.serve(app, app_port)
+                try:
+                    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{app_port}", limits=limits) as client:
+                        await run_workload(client, args)
+                finally:
+                    await stubs.shutdown(app_server)
+        finally:
+            await stubs.shutdown(github_server)
+            smtp_server.close()
+
+        print(f"GitHub stub requests: {github_stub.state.requests}, emails received: {stubs.SMTPSink.received}")
+
+
+async def run_workload(client: httpx.AsyncClient, args):
+    from ..src.vote import CHARACTERS_DATA
+
+    users = await prepare_users(args.users)
+    await login_all(client, users)
+    workload = Workload(client, users, [char["id"] for char in CHARACTERS_DATA])
+
+    # 预热：让缓存和连接池进入稳定状态
+    await workload.run(1, args.concurrency, DEFAULT_MIX)
+    workload.stats.clear()
+
+    start = time.perf_counter()
+    await workload.run(args.duration, args.concurrency, DEFAULT_MIX)
+    report(workload, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API 吞吐与延迟基准测试")
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--duration", type=float, default=10, help="测量时长（秒）")
+    parser.add_argument("--concurrency", type=int, default=32, help="并发客户端数量")
+    parser.add_argument("--users", type=int, default=50, help="预先创建的用户数量")
+    asyncio.run(main(parser.parse_args()))
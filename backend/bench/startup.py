@@ -0,0 +1,89 @@
+"""
+启动耗时基准测试。
+
+分别测量在全新解释器中导入应用的耗时，以及 lifespan 各阶段的耗时。
+数据库使用临时目录，不会影响本地数据。
+
+用法（在项目根目录下）：
+    uv run python -m backend.bench.startup [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .common import write_config
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent.parent
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.src
+elapsed = time.perf_counter() - start
+print(json.dumps({"import": elapsed, "polars_imported": "polars" in sys.modules}))
+"""
+
+LIFESPAN_PROBE = """
+import asyncio, json, time
+start = time.perf_counter()
+from backend.src import app, startup_timings
+import_time = time.perf_counter() - start
+
+async def main():
+    async with app.router.lifespan_context(app):
+        pass
+
+asyncio.run(main())
+print(json.dumps({"import": import_time, **startup_timings}))
+"""
+
+
+def run_probe(code: str, env: dict[str, str]) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=PROJECT_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list[dict]) -> dict[str, tuple[float, float]]:
+    keys = [key for key in samples[0] if isinstance(samples[0][key], float)]
+    return {key: (statistics.median(s[key] for s in samples), max(s[key] for s in samples)) for key in keys}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="测量应用导入和 lifespan 各阶段的耗时")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "ZSIM_CONFIG": write_config(tmp)}
+
+        import_samples = [run_probe(IMPORT_PROBE, env) for _ in range(args.runs)]
+        lifespan_samples = [run_probe(LIFESPAN_PROBE, env) for _ in range(args.runs)]
+
+    print(f"runs: {args.runs}")
+    print(f"polars imported at import time: {any(s['polars_imported'] for s in import_samples)}")
+    print(f"{'phase':<14}{'median (ms)':>14}{'max (ms)':>12}")
+    for name, (median, worst) in {
+        "import": summarize(import_samples)["import"],
+        **{k: v for k, v in summarize(lifespan_samples).items() if k != "import"},
+    }.items():
+        print(f"{name:<14}{median * 1000:>14.1f}{worst * 1000:>12.1f}")
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    main()
+    print(f"total benchmark time: {time.perf_counter() - start:.1f}s")
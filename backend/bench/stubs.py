@@ -0,0 +1,121 @@
+"""基准测试使用的本地替身：GitHub API / raw 文件服务和 SMTP 收件端"""
+
+import asyncio
+import json
+import socket
+
+import uvicorn
+from fastapi import FastAPI, Header, Response
+
+RELEASE = {
+    "tag_name": "v0.0.0-bench",
+    "prerelease": False,
+    "html_url": "https://github.com/ZSim-Dev/ZSim/releases/tag/v0.0.0-bench",
+    "assets": [
+        {
+            "name": "ZSim-v0.0.0-bench-windows-x64.zip",
+            "browser_download_url": "https://example.invalid/ZSim-windows-x64.zip",
+        }
+    ],
+}
+RELEASE_ETAG = '"bench-release"'
+CHARACTER_CSV = (
+    "CID,名称,动作建模,Buff支持,影画支持,精细测帧\n1011,安比,1,1,1,1\n1021,猫又,1,1,0,0\n1031,妮可,0,1,0,0\n"
+)
+CHARACTER_ETAG = '"bench-character"'
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_github_stub() -> FastAPI:
+    stub = FastAPI()
+    stub.state.requests = 0
+
+    @stub.get("/repos/{owner}/{repo}/releases/latest")
+    def latest_release(if_none_match: str | None = Header(None)):
+        stub.state.requests += 1
+        if if_none_match == RELEASE_ETAG:
+            return Response(status_code=304)
+        return Response(json.dumps(RELEASE), media_type="application/json", headers={"ETag": RELEASE_ETAG})
+
+    @stub.get("/repos/{owner}/{repo}/releases")
+    def releases(if_none_match: str | None = Header(None)):
+        stub.state.requests += 1
+        if if_none_match == RELEASE_ETAG:
+            return Response(status_code=304)
+        return Response(json.dumps([RELEASE]), media_type="application/json", headers={"ETag": RELEASE_ETAG})
+
+    @stub.get("/character.csv")
+    def character_csv(if_none_match: str | None = Header(None)):
+        stub.state.requests += 1
+        if if_none_match == CHARACTER_ETAG:
+            return Response(status_code=304)
+        return Response(CHARACTER_CSV, media_type="text/csv", headers={"ETag": CHARACTER_ETAG})
+
+    return stub
+
+
+async def serve(app, port: int) -> uvicorn.Server:
+    """在当前事件循环中启动 uvicorn，返回已就绪的 Server"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server.stub_task = asyncio.create_task(server.serve())
+    while not server.started:
+        if server.stub_task.done():
+            server.stub_task.result()
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def shutdown(server: uvicorn.Server):
+    server.should_exit = True
+    await server.stub_task
+
+
+class SMTPSink(asyncio.Protocol):
+    """只实现 smtplib 用到的最小命令集，收到的邮件只计数不保存；refused 中的收件地址以 550 拒收"""
+
+    received = 0
+    refused: set[bytes] = set()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.buffer = b""
+        self.in_data = False
+        transport.write(b"220 bench SMTP sink\r\n")
+
+    def data_received(self, data: bytes):
+        self.buffer += data
+        while True:
+            if self.in_data:
+                end = self.buffer.find(b"\r\n.\r\n")
+                if end < 0:
+                    return
+                self.buffer = self.buffer[end + 5 :]
+                self.in_data = False
+                SMTPSink.received += 1
+                self.transport.write(b"250 OK\r\n")
+                continue
+            line_end = self.buffer.find(b"\r\n")
+            if line_end < 0:
+                return
+            line, self.buffer = self.buffer[:line_end], self.buffer[line_end + 2 :]
+            command = line[:4].upper()
+            if command == b"DATA":
+                self.in_data = True
+                self.transport.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif command == b"RCPT" and any(address in line for address in SMTPSink.refused):
+                self.transport.write(b"550 No such user\r\n")
+            elif command == b"QUIT":
+                self.transport.write(b"221 Bye\r\n")
+                self.transport.close()
+                return
+            else:
+                self.transport.write(b"250 OK\r\n")
+
+
+async def start_smtp_sink(port: int) -> asyncio.Server:
+    return await asyncio.get_running_loop().create_server(SMTPSink, "127.0.0.1", port)
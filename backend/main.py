@@ -1,8 +1,38 @@
+import argparse
+
 import uvicorn
 
 from .src import app
+from .src.settings import get_settings
 
 __all__ = ["app"]
 
+
+def main():
+    """
+    生产环境入口：python -m backend.main --workers 4
+
+    多个工作进程通过共享缓存（database.cache_db_path）协调外部数据的刷新，
+    每份数据只由一个进程拉取，其他进程读取已发布的版本。
+    """
+    server = get_settings().server
+    parser = argparse.ArgumentParser(description="ZSim 官网后端")
+    parser.add_argument("--host", default=server.host)
+    parser.add_argument("--port", type=int, default=server.port)
+    parser.add_argument("--workers", type=int, default=server.workers)
+    parser.add_argument("--reload", action="store_true", help="开发模式，修改代码后自动重启（仅单进程）")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        "backend.main:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        # 票数推送在收到退出信号时即结束，其他未完成的请求关闭时最多等待这么久
+        timeout_graceful_shutdown=5,
+    )
+
+
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
+    main()
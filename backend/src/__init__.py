@@ -1,18 +1,25 @@
+import time
 from contextlib import asynccontextmanager
+from typing import Literal
 
-from fastapi import Depends, FastAPI
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import RedirectResponse
 from fastapi.security import OAuth2PasswordRequestForm
 
 from .auth import (
     EmailLoginRequest,
     SendCodeRequest,
     UserCreate,
+    check_send_code_rate,
     get_current_user,
     login_user,
     login_with_email,
+    logout_user,
     register_user,
     send_verification_code,
+    start_mailer,
+    stop_mailer,
 )
 from .auth import (
     close_db as close_auth_db,
@@ -20,16 +27,66 @@ from .auth import (
 from .auth import (
     init_db as init_auth_db,
 )
-from .github.release_api import LatestReleaseCache, get_latest_release_from_cache
-from .vote import init_vote_db
+from .github.release_api import (
+    LatestReleaseCache,
+    get_latest_release_from_cache,
+    stop_latest_release_refresh,
+    warm_latest_release_cache,
+)
+from .github.release_manifest import manifest_store
+from .logs import configure_logging, shutdown_logging
+from .metrics import REGISTRY, MetricsMiddleware
+from .outbound import outbound
+from .profiling import ProfilingMiddleware
+from .settings import get_settings
+from .shared_cache import shared_cache
+from .static_assets import router as static_router
+from .static_assets import start_static_assets, stop_static_assets
+from .vote import close_vote_db, init_vote_db, start_character_details_refresh, stop_character_details_refresh
 from .vote import router as vote_router
 
+# 各启动阶段的耗时（秒），供启动基准测试读取
+startup_timings: dict[str, float] = {}
+
+
+@asynccontextmanager
+async def startup_phase(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = time.perf_counter() - start
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_databases()
+    # 就绪前必须完成的阶段
+    async with startup_phase("settings"):
+        configure_logging(get_settings().logging)
+    async with startup_phase("outbound"):
+        await outbound.start(get_settings().outbound)
+    async with startup_phase("databases"):
+        await init_databases()
+    async with startup_phase("mailer"):
+        await start_mailer()
+    async with startup_phase("static"):
+        await start_static_assets()
+    # 网络相关的数据在后台预热，不阻塞就绪
+    async with startup_phase("background"):
+        warm_latest_release_cache()
+        await start_release_manifest()
+        await start_character_details_refresh()
     yield
-    await close_auth_db()
+    async with startup_phase("shutdown"):
+        # 先停止所有经出站客户端访问网络的后台任务，再关闭客户端
+        await stop_character_details_refresh()
+        await stop_latest_release_refresh()
+        await manifest_store.stop()
+        await outbound.stop()
+        await stop_static_assets()
+        await stop_mailer()
+        await close_databases()
+        shutdown_logging()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -41,14 +98,57 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilingMiddleware)
+
+
+def client_ip(request: Request) -> str:
+    """
+    客户端 IP；配置信任反向代理时取 X-Forwarded-For 中由代理追加的地址。
+
+    每一层代理都把它看到的对端地址追加在最右侧，左侧的条目由客户端随意填写，
+    因此从右往左数第 trusted_proxies 个地址才是最外层代理看到的真实客户端。
+    """
+    settings = get_settings().rate_limit
+    if settings.trust_forwarded_for:
+        addresses = [
+            address.strip()
+            for header in request.headers.getlist("X-Forwarded-For")
+            for address in header.split(",")
+            if address.strip()
+        ]
+        if addresses:
+            return addresses[-min(max(1, settings.trusted_proxies), len(addresses))]
+    return request.client.host if request.client else ""
+
+
+async def start_release_manifest():
+    """加载本地版本清单并在后台定期刷新"""
+    settings = get_settings()
+    manifest_store.path = settings.github.manifest_path
+    manifest_store.refresh_interval = settings.github.manifest_refresh_interval
+    manifest_store.per_page = settings.github.manifest_size
+    manifest_store.token = settings.github.token
+    manifest_store.sync_interval = settings.server.sync_interval
+    manifest_store.retry_backoff = settings.github.error_backoff
+    manifest_store.max_retry_backoff = settings.github.max_error_backoff
+    await manifest_store.start()
 
 
 async def init_databases():
+    await shared_cache.open(get_settings().database.cache_db_path)
     await init_auth_db()
     await init_vote_db()
 
 
+async def close_databases():
+    await close_vote_db()
+    await close_auth_db()
+    await shared_cache.close()
+
+
 app.include_router(vote_router, prefix="/api")
+app.include_router(static_router, prefix="/api")
 
 
 @app.post("/api/register")
@@ -61,9 +161,15 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     return await login_user(form_data)
 
 
+@app.post("/api/logout")
+async def logout(result: dict[str, str] = Depends(logout_user)):
+    return result
+
+
 @app.post("/api/send-code")
-async def send_code(request: SendCodeRequest):
+async def send_code(request: SendCodeRequest, http_request: Request):
     """发送验证码"""
+    check_send_code_rate(request.email, client_ip(http_request))
     return await send_verification_code(request)
 
 
@@ -78,11 +184,40 @@ def me(user: str = Depends(get_current_user)):
     return {"username": user}
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/api/github/latest-release")
 async def get_latest_release() -> LatestReleaseCache:
     return await get_latest_release_from_cache()
 
 
+@app.get("/api/releases")
+async def get_releases():
+    """最近版本清单：stable / prerelease 两个通道及按平台、格式索引的下载文件"""
+    return {
+        "fetched_at": manifest_store.manifest.get("fetched_at"),
+        "channels": manifest_store.manifest.get("channels", {}),
+    }
+
+
+@app.get("/api/download/{channel}/{platform}")
+async def download(
+    channel: Literal["stable", "prerelease"],
+    platform: str,
+    file_format: str | None = Query(None, alias="format", description="如 zip、7z、exe，默认取第一个"),
+):
+    """重定向到缓存中的下载地址，不访问 GitHub API"""
+    url = manifest_store.asset_url(channel, platform, file_format)
+    if url is None:
+        raise HTTPException(status_code=404, detail="没有可用的下载文件")
+    return RedirectResponse(url, status_code=302, headers={"Cache-Control": "public, max-age=60"})
+
+
 @app.get("/api/is_in_release")
 async def is_in_release() -> bool:
-    return False
+    """是否已有可下载的正式版本"""
+    stable = manifest_store.channel("stable")
+    return bool(stable and stable["assets"])
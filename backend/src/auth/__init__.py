@@ -1,15 +1,57 @@
-import hashlib
+import asyncio
+import logging
 import secrets
 import time
 
+import aiosqlite
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from pydantic import BaseModel, EmailStr, Field
 
+from ..metrics import register_gauge
+from ..ratelimit import TokenBucketLimiter, hit_all
+from ..settings import get_settings
+from ..shared_cache import shared_cache
 from .database import AuthDatabase
-from .email import send_email
+from .janitor import ExpiryJanitor
+from .mailer import MailDispatcher, MailQueueFull
+from .passwords import UNUSABLE_PASSWORD, PasswordHasher
+from .token_cache import TokenCache
 
+logger = logging.getLogger(__name__)
 db = AuthDatabase()
+token_cache = TokenCache()
+mailer = MailDispatcher(on_status=db.set_code_status)
+password_hasher = PasswordHasher()
+janitor = ExpiryJanitor(db, on_tokens_purged=token_cache.purge_expired)
+send_code_limiters: dict[str, TokenBucketLimiter] = {}
+_revocation_sync_task: asyncio.Task | None = None
+
+# 共享缓存中记录已注销 token 的事件通道
+REVOKED_TOKENS_CHANNEL = "revoked_tokens"
+REVOKED_TOKENS_RETENTION = 3600  # 事件只需保留到所有进程都读取过
+
+register_gauge("mail_queue_depth", "Emails waiting in the outbound queue", lambda: mailer.depth)
+register_gauge(
+    "token_cache",
+    "Token cache size and lookup counters",
+    lambda: {(key,): value for key, value in token_cache.stats().items()},
+    ("stat",),
+)
+register_gauge(
+    "janitor",
+    "Expiry janitor runs, last run time (unix seconds) and last run duration",
+    lambda: {(key,): value for key, value in janitor.stats().items()},
+    ("stat",),
+)
+register_gauge(
+    "send_code_rate_limit",
+    "Send-code rate limiter keys and decisions",
+    lambda: {
+        (name, key): value for name, limiter in send_code_limiters.items() for key, value in limiter.stats().items()
+    },
+    ("limiter", "stat"),
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 
@@ -39,18 +81,112 @@ class SendCodeRequest(BaseModel):
 
 async def init_db():
     """初始化数据库"""
+    settings = get_settings().auth
+    token_cache.maxsize = max(1, settings.token_cache_size)
+    await password_hasher.start(settings.password)
+    init_rate_limiters()
     await db.connect()
-    await db.delete_expired_tokens()
+    await janitor.start(settings.janitor_interval, settings.janitor_batch_size)
+
+    global _revocation_sync_task
+    last_seq = await shared_cache.last_event_seq(REVOKED_TOKENS_CHANNEL)
+    _revocation_sync_task = asyncio.create_task(_sync_revocations(last_seq, get_settings().server.sync_interval))
 
 
 async def close_db():
     """关闭数据库"""
+    global _revocation_sync_task
+    if _revocation_sync_task is not None:
+        _revocation_sync_task.cancel()
+        try:
+            await _revocation_sync_task
+        except asyncio.CancelledError:
+            pass
+        _revocation_sync_task = None
+    await janitor.stop()
     await db.close()
+    password_hasher.stop()
+
+
+async def start_mailer():
+    """启动邮件发送队列"""
+    await mailer.start()
+
+
+async def stop_mailer():
+    """停止邮件发送队列"""
+    await mailer.stop()
+
+
+async def issue_token(username: str) -> str:
+    """生成并保存新的访问 token"""
+    token = secrets.token_hex(16)
+    expire_time = await db.store_token(token, username)
+    token_cache.put(token, username, expire_time)
+    return token
+
+
+async def revoke_token(token: str):
+    """注销 token，并通知其他工作进程清除各自缓存中的该 token"""
+    token_cache.revoke(token)
+    await db.delete_token(token)
+    await shared_cache.append_event(REVOKED_TOKENS_CHANNEL, token)
+
+
+async def _sync_revocations(seq: int, interval: float):
+    """
+    读取其他进程注销的 token 并从本进程缓存中清除。
+
+    多进程部署时，已注销的 token 在其他进程中最多还能使用 interval 秒。
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            for event_seq, token in await shared_cache.events_since(REVOKED_TOKENS_CHANNEL, seq):
+                token_cache.revoke(token)
+                seq = event_seq
+            if await shared_cache.claim("prune_" + REVOKED_TOKENS_CHANNEL, REVOKED_TOKENS_RETENTION):
+                await shared_cache.prune_events(REVOKED_TOKENS_CHANNEL, time.time() - REVOKED_TOKENS_RETENTION)
+        except Exception:
+            logger.exception("Error syncing revoked tokens")
+
+
+def init_rate_limiters():
+    """按配置创建发送验证码的限流器"""
+    settings = get_settings().rate_limit
+    rules = settings.send_code
+    send_code_limiters.update(
+        total=TokenBucketLimiter(rules.total, max_keys=1),
+        ip=TokenBucketLimiter(rules.per_ip, settings.max_keys),
+        email=TokenBucketLimiter(rules.per_email, settings.max_keys),
+    )
+
+
+def check_send_code_rate(email: str, client_ip: str):
+    """
+    发送验证码前的限流检查，在任何数据库或 SMTP 操作之前执行。
+
+    客户端 IP、邮箱和总量三者都允许时才各消耗一个令牌，任一超限即返回 429，
+    被拒绝的请求不占用任何额度。
+    """
+    checks = [
+        (send_code_limiters[name], key)
+        for name, key in (("ip", client_ip), ("email", email.lower()), ("total", ""))
+        if name in send_code_limiters
+    ]
+    retry_after = hit_all(checks)
+    if retry_after > 0:
+        wait = int(retry_after) + 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"发送过于频繁，请等待 {wait} 秒后再试",
+            headers={"Retry-After": str(wait)},
+        )
 
 
-def hash_password(password: str) -> str:
-    """密码哈希"""
-    return hashlib.sha256(password.encode()).hexdigest()
+async def hash_password(password: str) -> str:
+    """密码哈希，在线程池中计算"""
+    return await password_hasher.hash(password)
 
 
 def generate_verification_code() -> str:
@@ -59,15 +195,14 @@ def generate_verification_code() -> str:
 
 
 async def is_code_valid(email: str, code: str) -> bool:
-    """验证验证码是否有效"""
-    stored_data = await db.get_code(email)
-    if not stored_data:
-        return False
+    """
+    只读地检查验证码是否有效，不消费验证码。
 
-    if time.time() > stored_data["expire_time"]:
-        await db.delete_code(email)
+    真正的消费在事务中通过 consume_code 完成；过期的验证码由 janitor 清理。
+    """
+    stored_data = await db.get_code(email)
+    if not stored_data or time.time() > stored_data["expire_time"]:
         return False
-
     return stored_data["code"] == code
 
 
@@ -76,30 +211,35 @@ async def register_user(user: UserCreate) -> dict[str, str]:
     if user.password != user.confirm_password:
         raise HTTPException(status_code=400, detail="密码和确认密码不匹配")
 
+    # 先做只读检查，避免为无效请求计算密码哈希；哈希在事务之外计算，不占用写锁
     if not await is_code_valid(user.email, user.code):
         raise HTTPException(status_code=401, detail="验证码无效或已过期")
-
-    await db.delete_code(user.email)
-
-    password_hash = hash_password(user.password)
-    success = await db.create_user(user.username, password_hash, user.email)
-
-    if not success:
-        user_by_email = await db.get_user_by_email(user.email)
-        if user_by_email:
-            raise HTTPException(status_code=400, detail="邮箱已被注册")
-        raise HTTPException(status_code=400, detail="用户名已存在")
+    password_hash = await hash_password(user.password)
+
+    # 消费验证码和创建用户在同一个事务中：注册失败时验证码保留，可以换个用户名重试
+    async with db.transaction() as tx:
+        if not await tx.consume_code(user.email, user.code):
+            raise HTTPException(status_code=401, detail="验证码无效或已过期")
+        try:
+            await tx.create_user(user.username, password_hash, user.email)
+        except aiosqlite.IntegrityError as e:
+            detail = "邮箱已被注册" if "users.email" in str(e) else "用户名已存在"
+            raise HTTPException(status_code=400, detail=detail) from None
 
     return {"msg": "注册成功"}
 
 
 async def login_user(form_data: OAuth2PasswordRequestForm):
     user = await db.get_user_by_username(form_data.username)
-    if not user or user["password"] != hash_password(form_data.password):
+    ok, needs_rehash = await password_hasher.verify(form_data.password, user["password"] if user else None)
+    if not ok:
         raise HTTPException(status_code=401, detail="用户名或密码错误")
 
-    token = secrets.token_hex(16)
-    await db.store_token(token, user["username"])
+    if needs_rehash:
+        # 旧格式或旧参数的哈希，登录成功时按当前参数重新计算
+        await db.update_password(user["username"], await hash_password(form_data.password))
+
+    token = await issue_token(user["username"])
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -113,51 +253,66 @@ async def send_verification_code(request: SendCodeRequest) -> dict[str, str]:
         raise HTTPException(status_code=400, detail="该邮箱未注册")
 
     code_data = await db.get_code(request.email)
-    if code_data and time.time() < code_data["expire_time"] - 240:  # 60秒内不能重复发送
+    if (
+        code_data
+        and code_data["status"] != "failed"
+        and time.time() < code_data["expire_time"] - 240  # 60秒内不能重复发送
+    ):
         remaining_time = int(code_data["expire_time"] - time.time() - 240)
         raise HTTPException(status_code=429, detail=f"发送过于频繁，请等待 {remaining_time} 秒后再试")
 
     code = generate_verification_code()
     await db.store_code(request.email, code)
 
-    print(f"[Auth]为邮箱 {request.email} 生成验证码: {code}")
+    # 验证码只作为结构化字段记录，默认会被隐去
+    logger.info("Verification code generated", extra={"email": request.email, "code": code})
 
+    subject = "ZSim验证码"
+    content = (
+        f"<h1>ZSim</h1><div>您的验证码是: {code}，请在5分钟内使用。</div><div>如果非本人操作，请忽略此邮件。</div>"
+    )
     try:
-        subject = "ZSim验证码"
-        content = (
-            f"<h1>ZSim</h1><div>您的验证码是: {code}，请在5分钟内使用。</div><div>如果非本人操作，请忽略此邮件。</div>"
-        )
-        send_email(request.email, subject, content)
-        return {"msg": "验证码发送成功"}
-    except Exception as e:
+        mailer.submit(request.email, subject, content, tag=code)
+    except MailQueueFull:
         await db.delete_code(request.email)
-        raise HTTPException(status_code=500, detail=f"验证码发送失败: {str(e)}")
+        raise HTTPException(status_code=503, detail="邮件服务繁忙，请稍后再试")
+    return {"msg": "验证码发送成功"}
 
 
 async def login_with_email(request: EmailLoginRequest) -> dict[str, str]:
     """邮箱验证码登录"""
-    if not await is_code_valid(request.email, request.code):
-        raise HTTPException(status_code=401, detail="验证码无效或已过期")
-
-    await db.delete_code(request.email)
-
-    user = await db.get_user_by_email(request.email)
-    if not user:
-        # 如果用户不存在，自动创建用户
-        password_hash = hash_password(secrets.token_hex(16))  # Generate a random password
-        await db.create_user(request.email, password_hash, request.email)
-        user = await db.get_user_by_email(request.email)
-
-    if not user:
-        raise HTTPException(status_code=500, detail="创建用户后无法检索")
-
-    token = secrets.token_hex(16)
-    await db.store_token(token, user["username"])
+    # 消费验证码、按需创建用户和保存 token 在同一个事务中完成，只提交一次
+    async with db.transaction() as tx:
+        if not await tx.consume_code(request.email, request.code):
+            raise HTTPException(status_code=401, detail="验证码无效或已过期")
+        user = await tx.get_user_by_email(request.email)
+        if not user:
+            # 如果用户不存在，自动创建用户
+            try:
+                user = await tx.create_user(request.email, UNUSABLE_PASSWORD, request.email)
+            except aiosqlite.IntegrityError:
+                # 邮箱未注册，冲突的只能是用户名：已有账户把这个邮箱地址用作了用户名
+                raise HTTPException(status_code=409, detail="该邮箱已被其他账户用作用户名") from None
+        token = secrets.token_hex(16)
+        expire_time = await tx.store_token(token, user["username"])
+
+    # 事务提交后再放入缓存，避免缓存中出现回滚掉的 token
+    token_cache.put(token, user["username"], expire_time)
     return {"access_token": token, "token_type": "bearer"}
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
-    username = await db.get_username_by_token(token)
-    if not username:
-        raise HTTPException(status_code=401, detail="无效token")
+    username = token_cache.get(token)
+    if username is None:
+        token_data = await db.get_token(token)
+        if not token_data or time.time() >= token_data["expire_time"]:
+            raise HTTPException(status_code=401, detail="无效token")
+        username = token_data["username"]
+        token_cache.put(token, username, token_data["expire_time"])
     return username
+
+
+async def logout_user(token: str = Depends(oauth2_scheme)) -> dict[str, str]:
+    """退出登录，使当前 token 失效"""
+    await revoke_token(token)
+    return {"msg": "已退出登录"}
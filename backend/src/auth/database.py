@@ -1,102 +1,226 @@
-import os
+import asyncio
 import time
-import tomllib
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
 
 import aiosqlite
 
-with open("backend/config.toml", "rb") as f:
-    config = tomllib.load(f)
-    DB_PATH = config["database"]["auth_db_path"]
+from ..db import SQLitePool
+from ..metrics import timed_query
+from ..settings import get_settings
+
+
+async def _add_code_status(conn: aiosqlite.Connection):
+    """verification_codes 增加投递状态列；此前的部分版本在建表时就已带有这一列"""
+    async with conn.execute("PRAGMA table_info(verification_codes)") as cursor:
+        columns = {row["name"] for row in await cursor.fetchall()}
+    if "status" not in columns:
+        await conn.execute("ALTER TABLE verification_codes ADD COLUMN status TEXT")
+
+
+# 按顺序执行的结构迁移，PRAGMA user_version 记录已经执行到第几个；
+# 每一步是一组 SQL 语句，或者需要先检查现有结构时，是一个接收连接的异步函数
+MIGRATIONS: tuple[tuple[str, ...] | Callable[[aiosqlite.Connection], Awaitable[None]], ...] = (
+    (
+        "CREATE INDEX IF NOT EXISTS idx_tokens_expire_time ON tokens (expire_time)",
+        "CREATE INDEX IF NOT EXISTS idx_verification_codes_expire_time ON verification_codes (expire_time)",
+    ),
+    _add_code_status,
+)
+
+# 可以按过期时间清理的表
+EXPIRING_TABLES = ("tokens", "verification_codes")
+
+
+class AuthTransaction:
+    """
+    AuthDatabase.transaction() 提供的工作单元。
+
+    所有操作在同一个写事务中执行，正常退出时一次提交，抛出异常时全部回滚。
+    """
+
+    def __init__(self, conn: aiosqlite.Connection):
+        self.conn = conn
+
+    async def _fetchone(self, sql, params=()):
+        async with self.conn.execute(sql, params) as cursor:
+            return await cursor.fetchone()
+
+    @timed_query("auth")
+    async def consume_code(self, email, code):
+        """验证码匹配且未过期时将其删除并返回 True；同一个验证码只能被一个请求消费"""
+        row = await self._fetchone(
+            "DELETE FROM verification_codes WHERE email=? AND code=? AND expire_time>? RETURNING email",
+            (email, code, time.time()),
+        )
+        return row is not None
+
+    @timed_query("auth")
+    async def create_user(self, username, password_hash, email):
+        """创建用户并返回新行；用户名或邮箱已存在时抛出 aiosqlite.IntegrityError"""
+        return await self._fetchone(
+            "INSERT INTO users (username, password, email) VALUES (?, ?, ?) RETURNING *",
+            (username, password_hash, email),
+        )
+
+    @timed_query("auth")
+    async def get_user_by_email(self, email):
+        return await self._fetchone("SELECT * FROM users WHERE email=?", (email,))
+
+    @timed_query("auth")
+    async def store_token(self, token, username, expire_duration=86400):  # 24 hours
+        expire_time = time.time() + expire_duration
+        await self.conn.execute(
+            "REPLACE INTO tokens (token, username, expire_time) VALUES (?, ?, ?)", (token, username, expire_time)
+        )
+        return expire_time
 
 
 class AuthDatabase:
-    def __init__(self, db_path=DB_PATH):
+    def __init__(self, db_path=None, read_pool_size=None):
+        # 未指定时在 connect 时从配置读取
         self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.pool = SQLitePool()
 
     async def connect(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self.conn = await aiosqlite.connect(self.db_path)
-        self.conn.row_factory = aiosqlite.Row
+        if self.db_path is None or self.read_pool_size is None:
+            settings = get_settings().database
+            self.db_path = self.db_path or settings.auth_db_path
+            self.read_pool_size = self.read_pool_size or settings.read_pool_size
+        await self.pool.open(self.db_path, self.read_pool_size)
         await self._create_tables()
+        await self._migrate()
 
     async def close(self):
-        await self.conn.close()
+        await self.pool.close()
 
     async def _create_tables(self):
-        await self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                email TEXT UNIQUE
-            )
-        """)
-        await self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS verification_codes (
-                email TEXT PRIMARY KEY,
-                code TEXT,
-                expire_time REAL
-            )
-        """)
-        await self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS tokens (
-                token TEXT PRIMARY KEY,
-                username TEXT,
-                expire_time REAL
-            )
-        """)
-        await self.conn.commit()
+        async with self.pool.writer() as conn:
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS users (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username TEXT UNIQUE,
+                    password TEXT,
+                    email TEXT UNIQUE
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS verification_codes (
+                    email TEXT PRIMARY KEY,
+                    code TEXT,
+                    expire_time REAL
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS tokens (
+                    token TEXT PRIMARY KEY,
+                    username TEXT,
+                    expire_time REAL
+                )
+            """)
+
+    async def _migrate(self):
+        async with self.pool.writer() as conn:
+            async with conn.execute("PRAGMA user_version") as cursor:
+                version = (await cursor.fetchone())[0]
+            for step in MIGRATIONS[version:]:
+                if callable(step):
+                    await step(conn)
+                else:
+                    for statement in step:
+                        await conn.execute(statement)
+            if version < len(MIGRATIONS):
+                await conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[AuthTransaction]:
+        """在一个写事务中执行多个操作，见 AuthTransaction"""
+        async with self.pool.writer() as conn:
+            yield AuthTransaction(conn)
+
+    async def _fetchone(self, sql, params=()):
+        async with self.pool.reader() as conn:
+            async with conn.execute(sql, params) as cursor:
+                return await cursor.fetchone()
 
     # User management
-    async def create_user(self, username, password_hash, email):
-        try:
-            await self.conn.execute(
-                "INSERT INTO users (username, password, email) VALUES (?, ?, ?)", (username, password_hash, email)
-            )
-            await self.conn.commit()
-            return True
-        except aiosqlite.IntegrityError:
-            return False
-
+    @timed_query("auth")
     async def get_user_by_username(self, username):
-        cursor = await self.conn.execute("SELECT * FROM users WHERE username=?", (username,))
-        return await cursor.fetchone()
+        return await self._fetchone("SELECT * FROM users WHERE username=?", (username,))
+
+    @timed_query("auth")
+    async def update_password(self, username, password_hash):
+        async with self.pool.writer() as conn:
+            await conn.execute("UPDATE users SET password=? WHERE username=?", (password_hash, username))
 
+    @timed_query("auth")
     async def get_user_by_email(self, email):
-        cursor = await self.conn.execute("SELECT * FROM users WHERE email=?", (email,))
-        return await cursor.fetchone()
+        return await self._fetchone("SELECT * FROM users WHERE email=?", (email,))
 
     # Verification code management
-    async def store_code(self, email, code, expire_duration=300):
+    @timed_query("auth")
+    async def store_code(self, email, code, expire_duration=300, status="queued"):
         expire_time = time.time() + expire_duration
-        await self.conn.execute(
-            "REPLACE INTO verification_codes (email, code, expire_time) VALUES (?, ?, ?)", (email, code, expire_time)
-        )
-        await self.conn.commit()
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "REPLACE INTO verification_codes (email, code, expire_time, status) VALUES (?, ?, ?, ?)",
+                (email, code, expire_time, status),
+            )
+
+    @timed_query("auth")
+    async def set_code_status(self, email, code, status):
+        """更新验证码邮件的投递状态；验证码已被替换或删除时不做任何事"""
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "UPDATE verification_codes SET status=? WHERE email=? AND code=?",
+                (status, email, code),
+            )
 
+    @timed_query("auth")
     async def get_code(self, email):
-        cursor = await self.conn.execute("SELECT * FROM verification_codes WHERE email=?", (email,))
-        return await cursor.fetchone()
+        return await self._fetchone("SELECT * FROM verification_codes WHERE email=?", (email,))
 
+    @timed_query("auth")
     async def delete_code(self, email):
-        await self.conn.execute("DELETE FROM verification_codes WHERE email=?", (email,))
-        await self.conn.commit()
+        async with self.pool.writer() as conn:
+            await conn.execute("DELETE FROM verification_codes WHERE email=?", (email,))
 
     # Token management
+    @timed_query("auth")
     async def store_token(self, token, username, expire_duration=86400):  # 24 hours
-        expire_time = time.time() + expire_duration
-        await self.conn.execute(
-            "REPLACE INTO tokens (token, username, expire_time) VALUES (?, ?, ?)", (token, username, expire_time)
-        )
-        await self.conn.commit()
-
-    async def get_username_by_token(self, token):
-        cursor = await self.conn.execute("SELECT * FROM tokens WHERE token=?", (token,))
-        token_data = await cursor.fetchone()
-        if token_data and time.time() < token_data["expire_time"]:
-            return token_data["username"]
-        return None
-
-    async def delete_expired_tokens(self):
-        await self.conn.execute("DELETE FROM tokens WHERE expire_time < ?", (time.time(),))
-        await self.conn.commit()
+        async with self.transaction() as tx:
+            return await tx.store_token(token, username, expire_duration)
+
+    @timed_query("auth")
+    async def get_token(self, token):
+        return await self._fetchone("SELECT * FROM tokens WHERE token=?", (token,))
+
+    @timed_query("auth")
+    async def delete_token(self, token):
+        async with self.pool.writer() as conn:
+            await conn.execute("DELETE FROM tokens WHERE token=?", (token,))
+
+    @timed_query("auth")
+    async def delete_expired(self, table, batch_size=500):
+        """
+        分批删除过期记录，返回删除的行数。
+
+        每批使用单独的短事务，批次之间让出事件循环，避免长时间占用写锁。
+        """
+        if table not in EXPIRING_TABLES:
+            raise ValueError(f"表 {table} 没有过期时间")
+        now = time.time()
+        total = 0
+        while True:
+            async with self.pool.writer() as conn:
+                cursor = await conn.execute(
+                    f"DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE expire_time < ? LIMIT ?)",
+                    (now, batch_size),
+                )
+                deleted = cursor.rowcount
+                await cursor.close()
+            total += deleted
+            if deleted < batch_size:
+                return total
+            await asyncio.sleep(0)
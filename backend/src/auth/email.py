@@ -1,45 +1,82 @@
+import logging
 import smtplib
-import tomllib
 from email.mime.text import MIMEText
 
-from pydantic import BaseModel
+from ..settings import EmailConfig, get_settings
 
+logger = logging.getLogger(__name__)
 
-class EmailConfig(BaseModel):
-    smtp_host: str
-    smtp_port: int
-    smtp_username: str
-    smtp_password: str
-    smtp_from: str
-    send_real_email: bool
 
+def get_email_config() -> EmailConfig:
+    return get_settings().aliyun.email
 
-# Load config
-with open("backend/config.toml", "rb") as f:
-    config = EmailConfig(**tomllib.load(f)["aliyun"]["email"])
+
+def build_message(email_config: EmailConfig, to_email: str, subject: str, content: str) -> MIMEText:
+    msg = MIMEText(content, "html", "utf-8")
+    msg["Subject"] = subject
+    msg["From"] = email_config.smtp_from
+    msg["To"] = to_email
+    return msg
+
+
+class SMTPSession:
+    """
+    可复用的 SMTP 会话。
+
+    首次发送时建立连接并登录，之后的邮件复用同一连接；
+    连接被服务器断开时自动重连一次。方法均为阻塞调用，应在线程中执行。
+    """
+
+    def __init__(self, email_config: EmailConfig):
+        self.config = email_config
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp_class = smtplib.SMTP_SSL if self.config.smtp_ssl else smtplib.SMTP
+        server = smtp_class(self.config.smtp_host, self.config.smtp_port, timeout=self.config.smtp_timeout)
+        if self.config.smtp_username:
+            server.login(self.config.smtp_username, self.config.smtp_password)
+        return server
+
+    def send(self, msg: MIMEText):
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            self._server = self._connect()
+            self._server.send_message(msg)
+
+    def close(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._server = None
+
+
+def log_email(to_email: str, subject: str, content: str):
+    # 正文包含验证码，只有关闭日志脱敏时才会完整输出
+    logger.info("Mock email sent", extra={"to": to_email, "subject": subject, "content": content})
 
 
 def send_email(to_email: str, subject: str, content: str):
     """
     Sends an email.
     If send_real_email in the config is set to True, it sends a real email.
-    Otherwise, it prints the email content to the console.
+    Otherwise, it logs the email instead.
     """
+    config = get_email_config()
     if config.send_real_email:
-        msg = MIMEText(content, "html", "utf-8")
-        msg["Subject"] = subject
-        msg["From"] = config.smtp_from
-        msg["To"] = to_email
-
-        with smtplib.SMTP_SSL(config.smtp_host, config.smtp_port) as server:
-            server.login(config.smtp_username, config.smtp_password)
-            server.send_message(msg)
+        session = SMTPSession(config)
+        try:
+            session.send(build_message(config, to_email, subject, content))
+        finally:
+            session.close()
     else:
-        print("--- Mock Email Sent ---")
-        print(f"To: {to_email}")
-        print(f"Subject: {subject}")
-        print(f"Content: {content}")
-        print("----------------------")
+        log_email(to_email, subject, content)
 
 
 if __name__ == "__main__":
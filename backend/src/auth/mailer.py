@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import smtplib
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from ..metrics import mail_events_total
+from .email import EmailConfig, SMTPSession, build_message, get_email_config, log_email
+
+logger = logging.getLogger(__name__)
+
+StatusCallback = Callable[[str, str, str], Awaitable[None]]
+
+
+class MailQueueFull(Exception):
+    """邮件队列已满"""
+
+
+@dataclass
+class MailJob:
+    to_email: str
+    subject: str
+    content: str
+    tag: str = ""  # 回调状态时用于定位业务记录，例如验证码
+
+
+def _is_permanent_failure(error: Exception) -> bool:
+    """服务器以 5xx 拒绝（如收件人不存在、发件人被拒），重试也不会成功"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class MailDispatcher:
+    """
+    异步邮件发送队列。
+
+    请求处理函数只负责把邮件放入有界队列；少量后台 worker 各自持有一个已登录的
+    SMTP 会话，在线程中完成发送，暂时性的失败按指数退避重试，服务器以 5xx 拒绝时
+    直接判定失败。每封邮件的最终状态
+    （sent / failed）通过 on_status 回调通知调用方。
+    """
+
+    def __init__(self, email_config: EmailConfig | None = None, on_status: StatusCallback | None = None):
+        self.config = email_config
+        self.on_status = on_status
+        self._queue: asyncio.Queue[MailJob] | None = None
+        self._workers: list[asyncio.Task] = []
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if self.config is None:
+            self.config = get_email_config()
+        self._queue = asyncio.Queue(maxsize=self.config.queue_size)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, self.config.workers))]
+
+    async def stop(self, timeout: float = 10):
+        """尽量发送完队列中的邮件后停止所有 worker"""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except TimeoutError:
+                logger.warning("Dropping queued emails on shutdown", extra={"queued": self._queue.qsize()})
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, to_email: str, subject: str, content: str, tag: str = ""):
+        """放入发送队列，队列已满时抛出 MailQueueFull"""
+        if self._queue is None:
+            raise RuntimeError("邮件队列未启动")
+        try:
+            self._queue.put_nowait(MailJob(to_email, subject, content, tag))
+        except asyncio.QueueFull:
+            mail_events_total.inc(event="rejected")
+            raise MailQueueFull from None
+
+    async def _worker(self):
+        session = SMTPSession(self.config)
+        try:
+            while True:
+                job = await self._queue.get()
+                try:
+                    status = await self._deliver(session, job)
+                    if self.on_status is not None:
+                        await self.on_status(job.to_email, job.tag, status)
+                except Exception:
+                    logger.exception("Failed to report delivery status", extra={"to": job.to_email})
+                finally:
+                    self._queue.task_done()
+        finally:
+            await asyncio.to_thread(session.close)
+
+    async def _deliver(self, session: SMTPSession, job: MailJob) -> str:
+        if not self.config.send_real_email:
+            log_email(job.to_email, job.subject, job.content)
+            self.sent += 1
+            mail_events_total.inc(event="sent")
+            return "sent"
+
+        msg = build_message(self.config, job.to_email, job.subject, job.content)
+        for attempt in range(self.config.max_retries + 1):
+            try:
+                await asyncio.to_thread(session.send, msg)
+                self.sent += 1
+                mail_events_total.inc(event="sent")
+                return "sent"
+            except Exception as e:
+                if _is_permanent_failure(e):
+                    # smtplib 已重置会话，连接仍可继续使用
+                    logger.error("Delivery refused: %s", e, extra={"to": job.to_email})
+                    break
+                # 连接可能已处于不可用状态，丢弃后下次重新建立
+                await asyncio.to_thread(session.close)
+                if attempt == self.config.max_retries:
+                    logger.error("Giving up after %d attempts: %s", attempt + 1, e, extra={"to": job.to_email})
+                    break
+                mail_events_total.inc(event="retry")
+                await asyncio.sleep(self.config.retry_backoff * 2**attempt)
+        self.failed += 1
+        mail_events_total.inc(event="failed")
+        return "failed"
@@ -0,0 +1,94 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from ..settings import PasswordSettings
+
+# 通过邮箱验证码自动注册的用户没有可用的密码
+UNUSABLE_PASSWORD = "!"
+
+_LEGACY_SHA256 = re.compile(r"^[0-9a-f]{64}$")
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # hashlib.scrypt 在计算期间会释放 GIL，适合放在线程池中执行
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p + 1024 * 1024, dklen=32)
+
+
+def _hash_sync(password: str, settings: PasswordSettings) -> str:
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, settings.scrypt_n, settings.scrypt_r, settings.scrypt_p)
+    return f"scrypt${settings.scrypt_n}${settings.scrypt_r}${settings.scrypt_p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def _verify_sync(password: str, stored: str, settings: PasswordSettings) -> tuple[bool, bool]:
+    if _LEGACY_SHA256.match(stored):
+        # 旧版本的无盐 sha256 哈希，验证通过后需要升级
+        ok = hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        return ok, ok
+
+    parts = stored.split("$")
+    if len(parts) != 6 or parts[0] != "scrypt":
+        return False, False
+    n, r, p = (int(value) for value in parts[1:4])
+    digest = _scrypt(password, _b64decode(parts[4]), n, r, p)
+    ok = hmac.compare_digest(digest, _b64decode(parts[5]))
+    outdated = (n, r, p) != (settings.scrypt_n, settings.scrypt_r, settings.scrypt_p)
+    return ok, ok and outdated
+
+
+class PasswordHasher:
+    """
+    在有界线程池中计算密码哈希，避免 scrypt 这类耗时、耗内存的计算阻塞事件循环。
+
+    哈希格式为 scrypt$n$r$p$salt$hash，自带参数，调整成本参数后旧哈希仍可验证，
+    并会在下次登录成功时按新参数重新计算。
+
+    用户不存在或没有可用密码时，仍对一个固定的占位哈希做一次完整验证，
+    使这类登录失败与密码错误耗时相同，无法据此判断邮箱或用户名是否已注册。
+    """
+
+    def __init__(self):
+        self.settings = PasswordSettings()
+        self._executor: ThreadPoolExecutor | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._dummy_hash = ""
+
+    async def start(self, settings: PasswordSettings):
+        self.settings = settings
+        self._executor = ThreadPoolExecutor(max_workers=max(1, settings.workers), thread_name_prefix="password")
+        self._semaphore = asyncio.Semaphore(max(1, settings.max_concurrency))
+        self._dummy_hash = await self.hash(secrets.token_urlsafe(16))
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func, *args):
+        if self._executor is None or self._semaphore is None:
+            raise RuntimeError("密码哈希线程池未启动")
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_sync, password, self.settings)
+
+    async def verify(self, password: str, stored: str | None) -> tuple[bool, bool]:
+        """返回 (密码是否正确, 是否需要重新哈希)"""
+        if not stored or stored == UNUSABLE_PASSWORD:
+            await self._run(_verify_sync, password, self._dummy_hash, self.settings)
+            return False, False
+        return await self._run(_verify_sync, password, stored, self.settings)
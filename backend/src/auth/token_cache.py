@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    token -> (username, expire_time) 的进程内 LRU 缓存。
+
+    条目在数据库中记录的 expire_time 到期后失效；超过 maxsize 时淘汰最久未使用的条目。
+    写入或删除 token 的代码路径需要同步调用 put / revoke，以保持与数据库一致。
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = max(1, maxsize)
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, token: str) -> str | None:
+        """返回 token 对应的用户名；未命中或已过期时返回 None"""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        username, expire_time = entry
+        if time.time() >= expire_time:
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return username
+
+    def put(self, token: str, username: str, expire_time: float):
+        self._entries[token] = (username, expire_time)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def revoke(self, token: str):
+        """使单个 token 立即失效"""
+        self._entries.pop(token, None)
+
+    def purge_expired(self) -> int:
+        """清除所有已过期的条目，返回清除的数量"""
+        now = time.time()
+        expired = [token for token, (_, expire_time) in self._entries.items() if expire_time <= now]
+        for token in expired:
+            del self._entries[token]
+        return len(expired)
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,193 @@
+import asyncio
+import json
+import logging
+import os
+from io import BytesIO
+from typing import TYPE_CHECKING, Callable
+
+from .metrics import cache_events_total
+from .outbound import CircuitOpenError, outbound
+from .shared_cache import SharedCache
+
+# Polars 的导入开销较大，只在后台加载/刷新任务中按需导入
+if TYPE_CHECKING:
+    import polars as pl
+
+CSV_URL = "https://raw.githubusercontent.com/LoTwT/ZSim/refs/heads/main/zsim/data/character.csv"
+SHARED_KEY = "character_details"
+
+logger = logging.getLogger(__name__)
+
+
+def parse_character_csv(content: bytes) -> "pl.DataFrame":
+    """解析角色 CSV 并添加角色支持度列"""
+    import polars as pl
+
+    df = pl.read_csv(BytesIO(content))
+    return df.with_columns(
+        pl.when((pl.col("动作建模") >= 1) & (pl.col("Buff支持") >= 1) & (pl.col("影画支持") >= 1))
+        .then(pl.lit(1))
+        .when((pl.col("动作建模") >= 0) & (pl.col("Buff支持") >= 0))
+        .then(pl.lit(0))
+        .otherwise(pl.lit(-1))
+        .alias("角色支持度")
+    )
+
+
+class CharacterDetailsStore:
+    """
+    角色详细数据的本地快照与后台刷新。
+
+    解析后的数据（含角色支持度列）保存为本地 Parquet 快照。后台任务启动后先以内存映射方式
+    读取快照，再定期用条件请求（ETag / Last-Modified）检查 GitHub 上的 CSV，
+    有更新时先写临时文件再原子替换快照，并整体替换内存中的数据。
+    请求处理路径只读取内存数据，从不等待网络。
+
+    多个工作进程共用同一个快照文件：通过共享缓存中的租约，所有进程合计每 refresh_interval
+    秒只请求一次 GitHub；刷新成功的进程发布新的版本号，其他进程每 sync_interval 秒比较版本号，
+    发现变化时重新映射快照文件。刷新失败时租约按指数退避提前到期（retry_backoff 起翻倍，
+    不超过 max_retry_backoff），不必等满 refresh_interval 才重试。
+    """
+
+    def __init__(
+        self,
+        shared: SharedCache,
+        snapshot_path: str = "",
+        refresh_interval: float = 3600,
+        sync_interval: float = 2,
+        retry_backoff: float = 30,
+        max_retry_backoff: float = 900,
+        on_update: Callable[[list[dict]], None] | None = None,
+    ):
+        self.shared = shared
+        self.snapshot_path = snapshot_path
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.on_update = on_update
+        self.details: list[dict] = []
+        self._validators: dict[str, str] = {}
+        self._shared_version = 0
+        self._task: asyncio.Task | None = None
+
+    @property
+    def meta_path(self) -> str:
+        return self.snapshot_path + ".meta.json"
+
+    def _read_snapshot(self) -> tuple[list[dict], dict[str, str]] | None:
+        import polars as pl
+
+        try:
+            df = pl.read_parquet(self.snapshot_path, memory_map=True)
+        except (OSError, pl.exceptions.PolarsError) as e:
+            logger.info("No usable snapshot at %s: %s", self.snapshot_path, e)
+            return None
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                validators = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            validators = {}
+        return df.to_dicts(), validators
+
+    async def load_snapshot(self) -> bool:
+        """读取本地快照，成功时返回 True"""
+        snapshot = await asyncio.to_thread(self._read_snapshot)
+        if snapshot is None:
+            return False
+        details, self._validators = snapshot
+        self._swap(details)
+        cache_events_total.inc(cache="character_details", event="snapshot_load")
+        return True
+
+    def _swap(self, details: list[dict]):
+        self.details = details
+        if self.on_update is not None:
+            self.on_update(details)
+
+    def _write_snapshot(self, df: "pl.DataFrame", validators: dict[str, str]):
+        directory = os.path.dirname(self.snapshot_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.snapshot_path + ".tmp"
+        df.write_parquet(tmp_path)
+        os.replace(tmp_path, self.snapshot_path)
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(validators, f)
+        os.replace(tmp_meta, self.meta_path)
+
+    async def refresh(self) -> bool:
+        """从 GitHub 拉取 CSV，数据有变化并成功替换时返回 True"""
+        headers = {}
+        if etag := self._validators.get("etag"):
+            headers["If-None-Match"] = etag
+        if last_modified := self._validators.get("last_modified"):
+            headers["If-Modified-Since"] = last_modified
+
+        response = await outbound.get(CSV_URL, headers=headers)
+        if response.status_code == 304:
+            cache_events_total.inc(cache="character_details", event="not_modified")
+            return False
+        response.raise_for_status()
+
+        validators = {}
+        if etag := response.headers.get("ETag"):
+            validators["etag"] = etag
+        if last_modified := response.headers.get("Last-Modified"):
+            validators["last_modified"] = last_modified
+
+        # 解析和写文件都在线程中完成，不阻塞事件循环
+        df = await asyncio.to_thread(parse_character_csv, response.content)
+        await asyncio.to_thread(self._write_snapshot, df, validators)
+        self._validators = validators
+        self._swap(df.to_dicts())
+        cache_events_total.inc(cache="character_details", event="refresh")
+        return True
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_payload(self) -> bytes | None:
+        """刷新并返回要发布给其他进程的数据，没有变化时返回 None"""
+        if not await self.refresh():
+            return None
+        return json.dumps(self._validators).encode("utf-8")
+
+    async def sync(self):
+        """加载其他进程发布的新快照；轮到本进程刷新时请求 GitHub 并发布结果"""
+        entry = await self.shared.get(SHARED_KEY, self._shared_version)
+        if entry is not None:
+            self._shared_version = entry.version
+            if await self.load_snapshot():
+                logger.info("Reloaded shared snapshot", extra={"version": entry.version, "rows": len(self.details)})
+        version = await self.shared.refresh_leased(
+            SHARED_KEY, self.refresh_interval, self._refresh_payload, self.retry_backoff, self.max_retry_backoff
+        )
+        if version is not None:
+            self._shared_version = version
+            logger.info("Character details refreshed", extra={"rows": len(self.details)})
+
+    async def _run(self):
+        self._shared_version = await self.shared.version(SHARED_KEY)
+        await self.load_snapshot()
+        while True:
+            try:
+                await self.sync()
+            except CircuitOpenError as e:
+                # 继续使用已加载的数据，等熔断器放行后再刷新
+                cache_events_total.inc(cache="character_details", event="failure")
+                logger.warning("Skipped refreshing character details: %s", e)
+            except Exception:
+                cache_events_total.inc(cache="character_details", event="failure")
+                logger.exception("Error refreshing character details")
+            await asyncio.sleep(self.sync_interval)
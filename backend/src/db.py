@@ -0,0 +1,123 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiosqlite
+
+# 所有连接共用的 PRAGMA；journal_mode=WAL 是数据库级别的，持久生效
+_CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA mmap_size=67108864",
+)
+
+
+async def _pragma(conn: aiosqlite.Connection, pragma: str):
+    # 部分 PRAGMA 会返回结果行，及时关闭游标以免语句一直持有锁
+    async with conn.execute(pragma):
+        pass
+
+
+class SQLitePool:
+    """
+    SQLite 连接管理器。
+
+    持有一个有界的只读连接池和一个专用写连接。数据库运行在 WAL 模式下，
+    读连接之间、读与写之间互不阻塞；写操作通过锁串行化到唯一的写连接上，
+    避免多个连接争抢 SQLite 的写锁。
+    """
+
+    def __init__(self, db_path: str = "", read_pool_size: int = 4):
+        self.db_path = db_path
+        self.read_pool_size = max(1, read_pool_size)
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: list[aiosqlite.Connection] = []
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+
+    async def open(self, db_path: str | None = None, read_pool_size: int | None = None):
+        """打开写连接并预建读连接池，可在此时指定数据库路径和读连接数"""
+        if self._writer is not None:
+            return
+        if db_path is not None:
+            self.db_path = db_path
+        if read_pool_size is not None:
+            self.read_pool_size = max(1, read_pool_size)
+        # 事件循环相关的对象在 open 时创建，保证绑定到当前事件循环
+        self._readers = asyncio.Queue()
+        self._write_lock = asyncio.Lock()
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._writer = await self._connect()
+        await _pragma(self._writer, "PRAGMA journal_mode=WAL")
+
+        for _ in range(self.read_pool_size):
+            conn = await self._connect()
+            await _pragma(conn, "PRAGMA query_only=1")
+            self._all_readers.append(conn)
+            self._readers.put_nowait(conn)
+
+    async def close(self):
+        """关闭所有连接"""
+        for conn in self._all_readers:
+            await conn.close()
+        self._all_readers.clear()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(self.db_path)
+        conn.row_factory = aiosqlite.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            await _pragma(conn, pragma)
+        return conn
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """从池中借出一个只读连接，用完自动归还"""
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def snapshot(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        打开一个独立的只读连接并开启读事务，期间的所有查询看到同一个数据库快照。
+
+        用于导出等长时间的读取：不占用读连接池，WAL 模式下也不阻塞写入。
+        """
+        conn = await self._connect()
+        try:
+            await _pragma(conn, "PRAGMA query_only=1")
+            await conn.execute("BEGIN")
+            yield conn
+        finally:
+            await conn.close()
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        独占写连接并开启事务。
+
+        正常退出时提交，抛出异常时回滚。
+        """
+        if self._writer is None:
+            raise RuntimeError(f"数据库连接池未打开: {self.db_path}")
+        async with self._write_lock:
+            conn = self._writer
+            await conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
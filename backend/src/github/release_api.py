@@ -1,13 +1,27 @@
+import asyncio
 import datetime
+import json
+import logging
 from typing import Any
 
 import httpx
 from pydantic import BaseModel
 
+from ..metrics import cache_events_total
+from ..outbound import CircuitOpenError, outbound
+from ..settings import get_settings
+from ..shared_cache import shared_cache
+
 # --- Configuration ---
 REPO_OWNER = "ZSim-Dev"
 REPO_NAME = "ZSim"
 API_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases/latest"
+SHARED_KEY = "github_latest_release"
+LEASE_TTL = 15  # Longer than the request timeout, so only one worker talks to GitHub at a time
+
+logger = logging.getLogger(__name__)
+# Per-request events; debug level and sampled (see the logging settings)
+request_logger = logging.getLogger(__name__ + ".requests")
 
 
 # --- In-memory Cache ---
@@ -27,6 +41,38 @@ _latest_release_cache: LatestReleaseCache = LatestReleaseCache(
     expired_at=0,
 )
 
+# --- Revalidation State ---
+_etag: str | None = None  # ETag of the last successful response, used for conditional requests
+_refresh_task: asyncio.Task | None = None  # The single in-flight refresh, if any
+_consecutive_failures = 0
+_next_attempt_at = 0  # Do not contact GitHub again before this timestamp after an error
+_shared_version = 0  # Version of the shared entry this worker last published or adopted
+
+
+def _now() -> int:
+    return int(datetime.datetime.now().timestamp())
+
+
+def _request_headers() -> dict[str, str]:
+    headers = {"Accept": "application/vnd.github+json"}
+    if _etag:
+        headers["If-None-Match"] = _etag
+    if token := get_settings().github.token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def _record_failure():
+    global _consecutive_failures, _next_attempt_at
+    cache_events_total.inc(cache="latest_release", event="failure")
+    _consecutive_failures += 1
+    github_settings = get_settings().github
+    backoff = min(
+        github_settings.error_backoff * 2 ** (_consecutive_failures - 1),
+        github_settings.max_error_backoff,
+    )
+    _next_attempt_at = _now() + backoff
+
 
 # --- Core Logic ---
 async def _fetch_and_update_cache():
@@ -34,19 +80,27 @@ async def _fetch_and_update_cache():
     Fetches the latest release from GitHub and updates the cache.
     The 'stable' version is the one marked as 'latest' on GitHub,
     is not a pre-release, and has a valid Windows .zip asset.
+
+    The request is conditional on the stored ETag, so an unchanged release
+    only costs a 304 and simply extends the cache lifetime.
     """
-    global _latest_release_cache
-    expired_at = _latest_release_cache.expired_at
-    time_stamp_now = int(datetime.datetime.now().timestamp())
-    if expired_at > 0 and expired_at > time_stamp_now:
-        return
+    global _latest_release_cache, _etag, _consecutive_failures
+    time_stamp_now = _now()
+    release_ttl = get_settings().github.release_ttl
     try:
-        print("[GitHub] Fetching latest release...")
-        async with httpx.AsyncClient(timeout=10) as client:
-            response = await client.get(API_URL)
-            response.raise_for_status()
-            data: dict[str, Any] = response.json()
+        logger.info("Revalidating latest release")
+        response = await outbound.get(API_URL, headers=_request_headers())
+        if response.status_code == 304:
+            cache_events_total.inc(cache="latest_release", event="not_modified")
+            _latest_release_cache.expired_at = time_stamp_now + release_ttl
+            _consecutive_failures = 0
+            return
+        response.raise_for_status()
+        data: dict[str, Any] = response.json()
 
+        _etag = response.headers.get("ETag")
+        _consecutive_failures = 0
+        cache_events_total.inc(cache="latest_release", event="refresh")
         is_prerelease = data.get("prerelease", False)
 
         asset_url = None
@@ -61,27 +115,117 @@ async def _fetch_and_update_cache():
                 download_url=asset_url,
                 release_page_url=data.get("html_url"),
                 available=True,
-                expired_at=time_stamp_now + 60,
+                expired_at=time_stamp_now + release_ttl,
             )
-            print(f"[GitHub] Cache updated. Latest stable release: {data.get('tag_name')}")
+            logger.info("Cache updated", extra={"release": data.get("tag_name")})
         else:
             _latest_release_cache.available = False
+            _latest_release_cache.expired_at = time_stamp_now + release_ttl
             reason = "it's a pre-release" if is_prerelease else "no suitable download asset found"
-            print(f"[GitHub] No stable release available. Reason: {reason}.")
+            logger.info("No stable release available", extra={"reason": reason})
 
+    except CircuitOpenError as e:
+        # GitHub is unreachable; keep serving the cached release without waiting on it
+        logger.warning("Skipped revalidation: %s", e)
+        _record_failure()
     except httpx.HTTPStatusError as e:
         if e.response.status_code == 404:
-            print("[GitHub] No 'latest' release found for the repository.")
+            logger.warning("No 'latest' release found for the repository")
+            _latest_release_cache.available = False
         else:
-            print(f"[GitHub] HTTP error fetching latest release: {e}")
-        _latest_release_cache.available = False
-    except Exception as e:
-        print(f"[GitHub] An unexpected error occurred while fetching release: {e}")
-        _latest_release_cache.available = False
+            logger.warning("HTTP error fetching latest release: %s", e)
+        _record_failure()
+    except Exception:
+        logger.exception("Unexpected error fetching latest release")
+        _record_failure()
+
+
+def _shared_payload() -> bytes:
+    return json.dumps(
+        {
+            "release": _latest_release_cache.model_dump(),
+            "etag": _etag,
+            "consecutive_failures": _consecutive_failures,
+            "next_attempt_at": _next_attempt_at,
+        }
+    ).encode("utf-8")
+
+
+def _adopt(payload: bytes):
+    """Replaces the local state with the one another worker published."""
+    global _latest_release_cache, _etag, _consecutive_failures, _next_attempt_at
+    state = json.loads(payload)
+    _latest_release_cache = LatestReleaseCache.model_validate(state["release"])
+    _etag = state["etag"]
+    _consecutive_failures = state["consecutive_failures"]
+    _next_attempt_at = state["next_attempt_at"]
+
+
+async def _refresh():
+    """
+    Refreshes the cache, contacting GitHub at most once per TTL across all workers.
+
+    A newer state published by another worker is adopted as is. Otherwise the
+    worker that wins the lease fetches and publishes the result (including the
+    ETag and error backoff) for the others; the losers keep serving stale data.
+    """
+    global _shared_version
+    try:
+        entry = await shared_cache.get(SHARED_KEY, _shared_version)
+        if entry is not None:
+            _adopt(entry.payload)
+            _shared_version = entry.version
+        time_stamp_now = _now()
+        if _latest_release_cache.expired_at > time_stamp_now or time_stamp_now < _next_attempt_at:
+            return
+        if not await shared_cache.claim(SHARED_KEY, LEASE_TTL):
+            return
+        await _fetch_and_update_cache()
+        _shared_version = await shared_cache.publish(SHARED_KEY, _shared_payload())
+    except Exception:
+        logger.exception("Error syncing the shared release cache")
+
+
+def _schedule_refresh() -> asyncio.Task:
+    """Starts a refresh unless one is already in flight (single-flight)."""
+    global _refresh_task
+    if _refresh_task is None or _refresh_task.done():
+        _refresh_task = asyncio.create_task(_refresh())
+    return _refresh_task
+
+
+def warm_latest_release_cache():
+    """Kicks off the first fetch in the background, e.g. during startup."""
+    _schedule_refresh()
+
+
+async def stop_latest_release_refresh():
+    """Cancels an in-flight refresh on shutdown."""
+    if _refresh_task is not None and not _refresh_task.done():
+        _refresh_task.cancel()
+        try:
+            await _refresh_task
+        except asyncio.CancelledError:
+            pass
 
 
 async def get_latest_release_from_cache() -> LatestReleaseCache:
-    """Provides the currently cached latest release information."""
-    await _fetch_and_update_cache()
-    print(f"[GitHub] Returning cached release: {_latest_release_cache}")
+    """
+    Provides the currently cached latest release information.
+
+    Once expired, the stale entry is still returned immediately while a single
+    background task revalidates it. Only the very first lookup, before anything
+    has ever been fetched, waits for that task.
+    """
+    time_stamp_now = _now()
+    if _latest_release_cache.expired_at > time_stamp_now:
+        cache_events_total.inc(cache="latest_release", event="hit")
+    else:
+        cache_events_total.inc(cache="latest_release", event="stale")
+        if time_stamp_now >= _next_attempt_at:
+            task = _schedule_refresh()
+            if _latest_release_cache.expired_at == 0:
+                await asyncio.shield(task)
+    if request_logger.isEnabledFor(logging.DEBUG):
+        request_logger.debug("Returning cached release", extra={"release": _latest_release_cache.version})
     return _latest_release_cache
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from typing import Any
+
+from ..metrics import cache_events_total
+from ..outbound import CircuitOpenError, outbound
+from ..shared_cache import SharedCache, shared_cache
+from .release_api import REPO_NAME, REPO_OWNER
+
+RELEASES_URL = f"https://api.github.com/repos/{REPO_OWNER}/{REPO_NAME}/releases"
+SHARED_KEY = "github_release_manifest"
+CHANNELS = ("stable", "prerelease")
+
+logger = logging.getLogger(__name__)
+
+# Checked in order; the first pattern found in the lower-cased asset name wins
+_PLATFORM_PATTERNS = (
+    ("windows", re.compile(r"windows|(?<![a-z])win(32|64)?(?![a-z])|\.exe$|\.msi$")),
+    ("macos", re.compile(r"macos|(?<![a-z])mac(?![a-z])|darwin|osx|\.dmg$")),
+    ("linux", re.compile(r"linux|\.appimage$|\.deb$|\.rpm$")),
+)
+_FORMATS = (".tar.gz", ".tar.xz", ".zip", ".7z", ".exe", ".msi", ".dmg", ".appimage", ".deb", ".rpm")
+
+
+def classify_asset(name: str) -> tuple[str, str] | None:
+    """Returns (platform, format) for a release asset name, or None if it is not a download."""
+    lowered = name.lower()
+    file_format = next((ext.lstrip(".") for ext in _FORMATS if lowered.endswith(ext)), None)
+    if file_format is None:
+        return None
+    platform = next((platform for platform, pattern in _PLATFORM_PATTERNS if pattern.search(lowered)), None)
+    if platform is None:
+        return None
+    return platform, file_format
+
+
+def build_manifest(releases: list[dict[str, Any]], etag: str | None) -> dict[str, Any]:
+    """
+    Reduces the GitHub releases payload to what we serve.
+
+    The stable channel is the newest published non-prerelease, the prerelease
+    channel the newest published release of any kind. Each channel carries an
+    asset index keyed by platform, then format.
+    """
+    entries = []
+    for release in releases:
+        if release.get("draft"):
+            continue
+        assets: dict[str, dict[str, dict[str, Any]]] = {}
+        for asset in release.get("assets", []):
+            kind = classify_asset(asset.get("name", ""))
+            if kind is None:
+                continue
+            platform, file_format = kind
+            # Keep the first asset per platform and format, matching GitHub's upload order
+            assets.setdefault(platform, {}).setdefault(
+                file_format,
+                {"name": asset["name"], "url": asset.get("browser_download_url"), "size": asset.get("size")},
+            )
+        entries.append(
+            {
+                "version": release.get("tag_name", "N/A"),
+                "name": release.get("name"),
+                "prerelease": bool(release.get("prerelease")),
+                "published_at": release.get("published_at"),
+                "release_page_url": release.get("html_url"),
+                "assets": assets,
+            }
+        )
+    entries.sort(key=lambda entry: entry["published_at"] or "", reverse=True)
+
+    channels = {
+        "stable": next((entry for entry in entries if not entry["prerelease"]), None),
+        "prerelease": entries[0] if entries else None,
+    }
+    return {"fetched_at": int(time.time()), "etag": etag, "channels": channels, "releases": entries}
+
+
+class ReleaseManifestStore:
+    """
+    Locally persisted manifest of recent releases.
+
+    The manifest is loaded from disk on startup and refreshed in the background
+    with a conditional request. Across workers, a lease in the shared cache lets
+    a single worker contact GitHub per refresh interval; it rewrites the file
+    and publishes a new version, and the others reload the file when they see
+    that version change. Request handlers only ever read the in-memory copy.
+
+    A failed refresh shortens the lease to an exponential backoff (from
+    retry_backoff, capped at max_retry_backoff) so the next attempt does not
+    wait for the full refresh interval.
+    """
+
+    def __init__(
+        self,
+        shared: SharedCache,
+        path: str = "",
+        refresh_interval: float = 300,
+        sync_interval: float = 2,
+        per_page: int = 10,
+        retry_backoff: float = 30,
+        max_retry_backoff: float = 900,
+    ):
+        self.shared = shared
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.sync_interval = sync_interval
+        self.per_page = per_page
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.token = ""
+        self.manifest: dict[str, Any] = {}
+        self._shared_version = 0
+        self._task: asyncio.Task | None = None
+
+    def channel(self, name: str) -> dict[str, Any] | None:
+        return self.manifest.get("channels", {}).get(name)
+
+    def asset_url(self, channel: str, platform: str, file_format: str | None = None) -> str | None:
+        """Download URL for a channel and platform; any format if none is requested."""
+        release = self.channel(channel)
+        if release is None:
+            return None
+        formats = release["assets"].get(platform, {})
+        if file_format is not None:
+            asset = formats.get(file_format)
+        else:
+            asset = next(iter(formats.values()), None)
+        return asset["url"] if asset else None
+
+    def _read(self) -> dict[str, Any] | None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, manifest: dict[str, Any]):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    async def load(self) -> bool:
+        """Loads the manifest file; returns True if one was found."""
+        manifest = await asyncio.to_thread(self._read)
+        if manifest is None:
+            return False
+        self.manifest = manifest
+        return True
+
+    async def refresh(self) -> bool:
+        """Fetches the releases list; returns True if the manifest file was rewritten."""
+        headers = {"Accept": "application/vnd.github+json"}
+        if etag := self.manifest.get("etag"):
+            headers["If-None-Match"] = etag
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+
+        response = await outbound.get(RELEASES_URL, params={"per_page": self.per_page}, headers=headers)
+        if response.status_code == 304:
+            # Unchanged upstream; still record when the manifest was last confirmed.
+            cache_events_total.inc(cache="release_manifest", event="not_modified")
+            manifest = {**self.manifest, "fetched_at": int(time.time())}
+        else:
+            response.raise_for_status()
+            manifest = build_manifest(response.json(), response.headers.get("ETag"))
+            cache_events_total.inc(cache="release_manifest", event="refresh")
+        await asyncio.to_thread(self._write, manifest)
+        self.manifest = manifest
+        return True
+
+    async def _refresh_payload(self) -> bytes | None:
+        """Refreshes and returns what to publish to the other workers, or None if nothing changed."""
+        if not await self.refresh():
+            return None
+        return str(self.manifest["fetched_at"]).encode()
+
+    async def sync(self):
+        """Adopts a manifest another worker published, then refreshes if this worker wins the lease."""
+        entry = await self.shared.get(SHARED_KEY, self._shared_version)
+        if entry is not None:
+            self._shared_version = entry.version
+            await self.load()
+        version = await self.shared.refresh_leased(
+            SHARED_KEY, self.refresh_interval, self._refresh_payload, self.retry_backoff, self.max_retry_backoff
+        )
+        if version is not None:
+            self._shared_version = version
+            stable = self.channel("stable")
+            logger.info("Release manifest refreshed", extra={"stable": stable["version"] if stable else None})
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        self._shared_version = await self.shared.version(SHARED_KEY)
+        await self.load()
+        while True:
+            try:
+                await self.sync()
+            except CircuitOpenError as e:
+                cache_events_total.inc(cache="release_manifest", event="failure")
+                logger.warning("Skipped refreshing release manifest: %s", e)
+            except Exception:
+                cache_events_total.inc(cache="release_manifest", event="failure")
+                logger.exception("Error refreshing release manifest")
+            await asyncio.sleep(self.sync_interval)
+
+
+manifest_store = ReleaseManifestStore(shared_cache)
@@ -0,0 +1,147 @@
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import time
+
+from .metrics import register_gauge
+
+# 所有后端模块的 logger 都以 __name__ 命名，挂在这个 logger 之下
+ROOT_LOGGER = "backend"
+
+# 这些字段的值在输出前替换为 ***（通过 extra 传入）
+REDACTED_FIELDS = frozenset({"code", "token", "access_token", "password", "content"})
+# 消息文本中形似 token（32 位十六进制）的片段同样替换
+_TOKEN_PATTERN = re.compile(r"\b[0-9a-f]{32}\b")
+_REDACTED = "***"
+
+# LogRecord 自带的属性，其余属性都来自 extra，作为结构化字段输出
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {"message", "asctime", "taskName"}
+
+_listener: logging.handlers.QueueListener | None = None
+_handler: "DeferredQueueHandler | None" = None
+
+
+class SampleFilter(logging.Filter):
+    """只放行约 rate 比例的记录，用于高频事件"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return random.random() < self.rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    只把记录放入有界队列，格式化和输出都在后台线程中完成。
+
+    队列满时丢弃记录并计数，调用方永远不会因为日志而阻塞。
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内的队列不需要序列化，原样传递，把消息拼接也留给后台线程
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    输出一行文本或一个 JSON 对象，extra 中的字段作为结构化字段附加在后面。
+
+    redact 为 True 时隐去敏感字段和消息中的 token。
+    """
+
+    def __init__(self, output_format: str = "text", redact: bool = True):
+        super().__init__()
+        self.output_format = output_format
+        self.redact = redact
+
+    def _fields(self, record: logging.LogRecord) -> dict:
+        fields = {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRS}
+        if self.redact:
+            for key in fields.keys() & REDACTED_FIELDS:
+                fields[key] = _REDACTED
+        return fields
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if self.redact:
+            message = _TOKEN_PATTERN.sub(_REDACTED, message)
+        fields = self._fields(record)
+        if record.exc_info:
+            fields["exc"] = self.formatException(record.exc_info)
+
+        if self.output_format == "json":
+            entry = {
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+                **fields,
+            }
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        line = f"{timestamp} {record.levelname:<7} {record.name}: {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+def configure_logging(settings):
+    """
+    按配置设置后端的日志：各模块级别、采样率，以及后台输出线程。
+
+    可重复调用，之前的配置会先被撤销。
+    """
+    global _listener, _handler
+    shutdown_logging()
+
+    output = logging.StreamHandler()
+    output.setFormatter(StructuredFormatter(settings.format, settings.redact))
+    log_queue: queue.Queue = queue.Queue(maxsize=max(1, settings.queue_size))
+    _handler = DeferredQueueHandler(log_queue)
+    _listener = logging.handlers.QueueListener(log_queue, output)
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [_handler]
+    root.propagate = False
+    root.setLevel(settings.level.upper())
+    for name, level in settings.levels.items():
+        logging.getLogger(name).setLevel(level.upper())
+    for name, rate in settings.sample_rates.items():
+        logger = logging.getLogger(name)
+        logger.filters = [f for f in logger.filters if not isinstance(f, SampleFilter)]
+        logger.addFilter(SampleFilter(rate))
+    _listener.start()
+
+
+def shutdown_logging():
+    """停止后台线程，等待队列中的记录全部输出"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _handler = None
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+register_gauge("log_records_dropped", "Log records dropped because the output queue was full", dropped_records)
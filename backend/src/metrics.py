@@ -0,0 +1,227 @@
+import functools
+import time
+from bisect import bisect_left
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """取值由回调函数在抓取时提供；回调返回数值，或 标签值元组 -> 数值 的字典"""
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], float | dict[tuple[str, ...], float]],
+        labelnames: tuple[str, ...] = (),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def samples(self) -> list[str]:
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # 每组标签：[各桶计数..., +Inf 计数], 总和
+        self._values: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        entry = self._values.get(key)
+        if entry is None:
+            entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        counts, total = entry
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式（version 0.0.4）"""
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+http_requests_total: Counter = REGISTRY.register(
+    Counter("http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+)
+http_request_duration_seconds: Histogram = REGISTRY.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+)
+db_query_duration_seconds: Histogram = REGISTRY.register(
+    Histogram("db_query_duration_seconds", "SQLite query latency", ("db", "query"))
+)
+db_query_errors_total: Counter = REGISTRY.register(
+    Counter("db_query_errors_total", "SQLite queries that raised", ("db", "query"))
+)
+cache_events_total: Counter = REGISTRY.register(
+    Counter("cache_events_total", "Cache hits, refreshes and failures", ("cache", "event"))
+)
+mail_events_total: Counter = REGISTRY.register(
+    Counter("mail_events_total", "Outbound email delivery results", ("event",))
+)
+janitor_purged_rows_total: Counter = REGISTRY.register(
+    Counter("janitor_purged_rows_total", "Expired rows deleted by the auth janitor", ("table",))
+)
+outbound_requests_total: Counter = REGISTRY.register(
+    Counter("outbound_requests_total", "Outbound HTTP request attempts by upstream host", ("host", "outcome"))
+)
+outbound_request_duration_seconds: Histogram = REGISTRY.register(
+    Histogram("outbound_request_duration_seconds", "Outbound HTTP response latency", ("host",))
+)
+
+
+def register_gauge(
+    name: str,
+    documentation: str,
+    callback: Callable[[], float | dict[tuple[str, ...], float]],
+    labelnames: tuple[str, ...] = (),
+):
+    REGISTRY.register(Gauge(name, documentation, callback, labelnames))
+
+
+def timed_query(db: str, query: str | None = None):
+    """记录异步数据库操作耗时的装饰器，默认以函数名作为查询名"""
+
+    def decorator(func):
+        name = query or func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                db_query_errors_total.inc(db=db, query=name)
+                raise
+            finally:
+                db_query_duration_seconds.observe(time.perf_counter() - start, db=db, query=name)
+
+        return wrapper
+
+    return decorator
+
+
+class MetricsMiddleware:
+    """
+    ASGI 中间件，按路由模板记录请求数、状态码和延迟。
+
+    使用路由模板（如 /api/vote/character/{character_id}）而不是实际路径作为标签，
+    避免标签数量无限增长。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests_total.inc(method=method, route=route_path, status=str(status))
+            http_request_duration_seconds.observe(time.perf_counter() - start, method=method, route=route_path)
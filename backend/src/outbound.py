@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import random
+import time
+from urllib.parse import urlsplit
+
+import httpx
+
+from .metrics import outbound_request_duration_seconds, outbound_requests_total, register_gauge
+
+try:
+    import h2  # noqa: F401  httpx 只有在安装了 h2 时才支持 HTTP/2
+except ImportError:
+    HTTP2_AVAILABLE = False
+else:
+    HTTP2_AVAILABLE = True
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码通常是上游暂时不可用，值得重试，也计入熔断器的失败次数
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求未发出"""
+
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} 暂时不可用，{retry_after:.0f} 秒后重试")
+        self.host = host
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    单个上游主机的熔断器。
+
+    连续失败达到 threshold 次后打开，reset_timeout 秒内的请求直接失败；
+    之后放行一个试探请求（半开），成功则关闭，失败则重新打开。
+    """
+
+    def __init__(self, threshold: int = 5, reset_timeout: float = 30):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_request(self, host: str):
+        """不允许发出请求时抛出 CircuitOpenError"""
+        if self.opened_at is None:
+            return
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if remaining > 0 or self._probing:
+            raise CircuitOpenError(host, max(remaining, 0))
+        self._probing = True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self):
+        """试探请求被取消，没有结果，下一个请求可以重新试探"""
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+
+class OutboundClient:
+    """
+    应用共享的出站 HTTP 客户端，由 lifespan 启动和关闭。
+
+    所有请求复用同一个连接池（可用时使用 HTTP/2），按主机设置超时；
+    连接错误、超时和可重试的状态码按带随机抖动的指数退避重试，
+    每个主机各有一个熔断器，上游持续不可用时直接抛出 CircuitOpenError，
+    调用方据此继续使用已缓存的数据。
+    """
+
+    def __init__(self):
+        self.client: httpx.AsyncClient | None = None
+        self.host_timeouts: dict[str, float] = {}
+        self.max_retries = 2
+        self.retry_backoff = 0.5
+        self.max_retry_backoff = 5.0
+        self.breaker_threshold = 5
+        self.breaker_reset = 30.0
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    async def start(self, settings, transport: httpx.AsyncBaseTransport | None = None):
+        """transport 用于在测试中替换网络层，如 httpx.MockTransport"""
+        await self.stop()
+        self.host_timeouts = dict(settings.host_timeouts)
+        self.max_retries = settings.max_retries
+        self.retry_backoff = settings.retry_backoff
+        self.max_retry_backoff = settings.max_retry_backoff
+        self.breaker_threshold = settings.breaker_threshold
+        self.breaker_reset = settings.breaker_reset
+        self.breakers = {}
+        self.client = httpx.AsyncClient(
+            http2=settings.http2 and HTTP2_AVAILABLE,
+            timeout=httpx.Timeout(settings.timeout, connect=settings.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=settings.max_connections,
+                max_keepalive_connections=settings.max_keepalive_connections,
+                keepalive_expiry=settings.keepalive_expiry,
+            ),
+            transport=transport,
+        )
+
+    async def stop(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        if (breaker := self.breakers.get(host)) is None:
+            breaker = self.breakers[host] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+        return breaker
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter：在 [0, 上限] 内均匀取值，避免多个进程同时重试
+        return random.uniform(0, min(self.retry_backoff * 2**attempt, self.max_retry_backoff))
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        """
+        发出 GET 请求并返回响应，不检查状态码。
+
+        重试用尽后，最后一次的连接错误会原样抛出；可重试的状态码则返回最后一次的响应。
+        """
+        if self.client is None:
+            raise RuntimeError("出站 HTTP 客户端未启动")
+        host = urlsplit(url).hostname or ""
+        breaker = self.breaker(host)
+        kwargs.setdefault("timeout", self.host_timeouts.get(host, httpx.USE_CLIENT_DEFAULT))
+
+        attempt = 0
+        while True:
+            try:
+                breaker.before_request(host)
+            except CircuitOpenError:
+                outbound_requests_total.inc(host=host, outcome="short_circuit")
+                raise
+            start = time.perf_counter()
+            try:
+                response = await self.client.get(url, **kwargs)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                outbound_requests_total.inc(host=host, outcome="error")
+                if attempt == self.max_retries:
+                    raise
+                logger.info("Retrying after %s", type(e).__name__, extra={"host": host, "attempt": attempt + 1})
+            else:
+                outbound_request_duration_seconds.observe(time.perf_counter() - start, host=host)
+                if response.status_code not in RETRYABLE_STATUS:
+                    breaker.record_success()
+                    outbound_requests_total.inc(host=host, outcome="ok")
+                    return response
+                breaker.record_failure()
+                outbound_requests_total.inc(host=host, outcome="retryable_status")
+                if attempt == self.max_retries:
+                    return response
+                logger.info(
+                    "Retrying after status %d", response.status_code, extra={"host": host, "attempt": attempt + 1}
+                )
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+
+outbound = OutboundClient()
+
+_BREAKER_STATES = {"closed": 0, "half_open": 0.5, "open": 1}
+register_gauge(
+    "outbound_circuit_state",
+    "Circuit breaker state per upstream host: 0 closed, 0.5 half open, 1 open",
+    lambda: {(host,): _BREAKER_STATES[breaker.state] for host, breaker in outbound.breakers.items()},
+    ("host",),
+)
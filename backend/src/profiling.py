@@ -0,0 +1,161 @@
+import asyncio
+import fnmatch
+import os
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+from .settings import get_settings
+
+PROFILE_HEADER = b"x-profile"
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+def _thread_stack(frame: FrameType | None) -> list[str]:
+    """线程调用栈，从最外层到最内层"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _await_stack(coro) -> list[str]:
+    """挂起中的协程沿 await 链向内展开的调用栈，末尾是正在等待的对象"""
+    stack = []
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "ag_frame", None) or getattr(coro, "gi_frame", None)
+        if frame is None:
+            break
+        stack.append(_frame_name(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "ag_await", None) or getattr(coro, "gi_yieldfrom", None)
+        if coro is not None and not hasattr(coro, "cr_frame") and not hasattr(coro, "ag_frame"):
+            stack.append(f"[await {type(coro).__name__}]")
+            break
+    return stack
+
+
+class RequestSampler:
+    """
+    在独立线程中定时采样一个请求的调用栈。
+
+    请求所在的任务正在事件循环上运行时，采样事件循环线程的调用栈，记为 cpu；
+    任务挂起时沿协程的 await 链展开，记为 wait，末尾标出正在等待的对象，
+    例如等待 aiosqlite 线程执行查询的 Future。结果按 collapsed stack 格式汇总，
+    可直接用 flamegraph.pl 或 speedscope 打开。
+    """
+
+    def __init__(self, task: asyncio.Task, interval: float):
+        self.task = task
+        self.loop = task.get_loop()
+        self.interval = interval
+        self.samples: Counter[str] = Counter()
+        self._loop_thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self):
+        self._thread.join()
+
+    def _sample(self):
+        if asyncio.current_task(self.loop) is self.task:
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ["cpu", *_thread_stack(frame)]
+        else:
+            stack = ["wait", *_await_stack(self.task.get_coro())]
+        self.samples[";".join(stack)] += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._sample()
+            except RuntimeError:
+                # 任务或事件循环状态在采样途中发生变化，丢弃这一次采样
+                pass
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.items())
+
+
+def _write_profile(directory: str, name: str, content: str, max_files: int):
+    """写入 profile 文件，并只保留最新的 max_files 个"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        f.write(content)
+    files = sorted(entry for entry in os.listdir(directory) if entry.endswith(".folded"))
+    for old in files[: max(0, len(files) - max_files)]:
+        try:
+            os.remove(os.path.join(directory, old))
+        except FileNotFoundError:
+            pass
+
+
+class ProfilingMiddleware:
+    """
+    按需对请求做采样分析的 ASGI 中间件。
+
+    配置开启时按 sample_rate 的比例对匹配 routes（支持通配符）的请求采样；
+    配置了 token 时，携带 X-Profile: <token> 请求头的请求总会被采样。
+    两者都未配置时直接转发请求，几乎没有额外开销。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> bool:
+        settings = get_settings().profiling
+        if settings.token:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER and secrets.compare_digest(value, settings.token.encode()):
+                    return True
+        if not settings.enabled or random.random() >= settings.sample_rate:
+            return False
+        return any(fnmatch.fnmatchcase(scope["path"], pattern) for pattern in settings.routes)
+
+    async def __call__(self, scope, receive, send):
+        settings = get_settings().profiling
+        if scope["type"] != "http" or not (settings.enabled or settings.token) or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = RequestSampler(asyncio.current_task(), settings.interval_ms / 1000)
+        start = time.time()
+        name = f"{time.strftime('%Y%m%d-%H%M%S', time.localtime(start))}-{int(start * 1000) % 1000:03d}"
+        name += f"-{scope['method']}{re.sub(r'[^A-Za-z0-9]+', '_', scope['path'])}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = [*message["headers"], (b"x-profile-id", name.encode())]
+            await send(message)
+
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            await asyncio.to_thread(sampler.join)
+            elapsed_ms = int((time.time() - start) * 1000)
+            await asyncio.to_thread(
+                _write_profile,
+                settings.output_dir,
+                f"{name}-{elapsed_ms}ms.folded",
+                sampler.collapsed(),
+                settings.max_files,
+            )
@@ -0,0 +1,56 @@
+from bisect import bisect_left, insort
+
+
+class VoteRanking:
+    """
+    按票数降序维护的角色排名。
+
+    有序列表中保存 (-票数, 角色 ID)，票数变化时用二分查找删除旧位置并插入新位置，
+    查询前 N 名或某个角色的名次都不需要重新排序。
+    名次采用并列排名：票数相同的角色名次相同，下一名次跳过并列的数量。
+    """
+
+    def __init__(self):
+        self._keys: list[tuple[int, int]] = []
+        self._votes: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def reset(self, votes: dict[int, int]):
+        self._votes = dict(votes)
+        self._keys = sorted((-count, cid) for cid, count in votes.items())
+
+    def update(self, votes: dict[int, int]):
+        """更新部分角色的票数"""
+        for cid, count in votes.items():
+            old = self._votes.get(cid)
+            if old == count:
+                continue
+            if old is not None:
+                index = bisect_left(self._keys, (-old, cid))
+                del self._keys[index]
+            self._votes[cid] = count
+            insort(self._keys, (-count, cid))
+
+    def rank_of_votes(self, count: int) -> int:
+        """票数为 count 的角色的名次（票数更多的角色数量 + 1）"""
+        return bisect_left(self._keys, (-count,)) + 1
+
+    def rank(self, character_id: int) -> int | None:
+        count = self._votes.get(character_id)
+        if count is None:
+            return None
+        return self.rank_of_votes(count)
+
+    def votes(self, character_id: int) -> int | None:
+        return self._votes.get(character_id)
+
+    def top(self, n: int) -> list[tuple[int, int, int]]:
+        """前 n 名的 (名次, 角色 ID, 票数)"""
+        result = []
+        for index, (negative, cid) in enumerate(self._keys[:n]):
+            # 与前一名票数相同则沿用其名次
+            rank = result[-1][0] if result and result[-1][2] == -negative else index + 1
+            result.append((rank, cid, -negative))
+        return result
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+
+class RateLimitRule(BaseModel):
+    capacity: int  # 突发上限
+    period: float  # 补满 capacity 所需的秒数
+
+
+class TokenBucketLimiter:
+    """
+    按键计数的令牌桶限流器。
+
+    每个键一个桶，容量为 capacity，每 period 秒补满。
+    键的数量超过 max_keys 时淘汰最久未访问的桶，内存占用有上限；
+    被淘汰的键相当于桶已补满，只会让限流变宽松，不会误拒。
+    """
+
+    def __init__(self, rule: RateLimitRule, max_keys: int = 100000):
+        self.capacity = max(1, rule.capacity)
+        self.refill_rate = self.capacity / max(rule.period, 1e-6)
+        self.max_keys = max(1, max_keys)
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _tokens(self, key: str, now: float) -> float:
+        tokens, updated_at = self._buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.refill_rate)
+
+    def peek(self, key: str) -> float:
+        """不消耗令牌，返回需要等待的秒数，有令牌时返回 0"""
+        tokens = self._tokens(key, time.monotonic())
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.refill_rate
+
+    def hit(self, key: str) -> float:
+        """消耗一个令牌。允许时返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        tokens = self._tokens(key, now)
+
+        if tokens >= 1:
+            retry_after = 0.0
+            tokens -= 1
+            self.allowed += 1
+        else:
+            retry_after = (1 - tokens) / self.refill_rate
+            self.rejected += 1
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def stats(self) -> dict[str, int]:
+        return {"keys": len(self._buckets), "allowed": self.allowed, "rejected": self.rejected}
+
+
+def hit_all(checks: list[tuple[TokenBucketLimiter, str]]) -> float:
+    """
+    同时检查多个限流器：全部允许时各消耗一个令牌并返回 0，
+    否则不消耗任何令牌，返回最长的等待秒数。
+
+    被某个限流器拒绝的请求不会占用其他限流器的额度，
+    例如单个 IP 的大量请求不会耗尽所有用户共享的总量额度。
+    """
+    waits = [limiter.peek(key) for limiter, key in checks]
+    retry_after = max(waits, default=0.0)
+    if retry_after > 0:
+        for (limiter, _), wait in zip(checks, waits):
+            if wait > 0:
+                limiter.rejected += 1
+        return retry_after
+    for limiter, key in checks:
+        limiter.hit(key)
+    return 0.0
@@ -0,0 +1,209 @@
+import functools
+import os
+import tomllib
+from pathlib import Path
+
+from pydantic import BaseModel, ConfigDict, field_validator
+
+from .ratelimit import RateLimitRule
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+PROJECT_DIR = BACKEND_DIR.parent
+CONFIG_ENV_VAR = "ZSIM_CONFIG"
+
+
+def _resolve_path(value: str) -> str:
+    # 相对路径以项目根目录为基准，与以往在项目根目录下启动时的位置保持一致
+    path = Path(value).expanduser()
+    if not path.is_absolute():
+        path = PROJECT_DIR / path
+    return str(path)
+
+
+class EmailConfig(BaseModel):
+    smtp_host: str
+    smtp_port: int
+    smtp_username: str
+    smtp_password: str
+    smtp_from: str
+    send_real_email: bool
+    smtp_ssl: bool = True  # 本地调试用的 SMTP 替身通常不支持 SSL
+    smtp_timeout: float = 10
+    workers: int = 2
+    queue_size: int = 1000
+    max_retries: int = 3
+    retry_backoff: float = 1.0
+
+
+class AliyunSettings(BaseModel):
+    access_key_id: str = ""
+    access_key_secret: str = ""
+    email: EmailConfig
+
+
+class DatabaseSettings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
+    auth_db_path: str
+    vote_db_path: str
+    cache_db_path: str = "./.database/cache.db"  # 多个工作进程共享的缓存
+    read_pool_size: int = 4
+
+    @field_validator("auth_db_path", "vote_db_path", "cache_db_path")
+    @classmethod
+    def _resolve_paths(cls, value: str) -> str:
+        return _resolve_path(value)
+
+
+class PasswordSettings(BaseModel):
+    scrypt_n: int = 16384  # CPU / 内存成本，必须是 2 的幂
+    scrypt_r: int = 8
+    scrypt_p: int = 1
+    workers: int = 2  # 哈希线程数
+    max_concurrency: int = 4  # 同时在计算或排队进入线程池的哈希数量上限
+
+
+class AuthSettings(BaseModel):
+    token_cache_size: int = 10000
+    janitor_interval: float = 600  # 清理过期 token 和验证码的间隔（秒）
+    janitor_batch_size: int = 500
+    password: PasswordSettings = PasswordSettings()
+
+
+class VoteSettings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
+    flush_interval_ms: float = 5
+    flush_batch_size: int = 200
+    character_snapshot_path: str = "./.database/character.parquet"
+    character_refresh_interval: float = 3600
+    character_retry_backoff: float = 30  # 刷新失败后首次重试前的等待时间（秒），之后翻倍
+    character_max_retry_backoff: float = 900
+    stream_window_ms: float = 200  # 票数推送的合并窗口
+    stream_buffer_size: int = 64  # 每个订阅者最多积压的消息数，超出后改发完整快照
+    stream_keepalive: float = 15  # 空闲连接的保活间隔（秒）
+    export_admins: list[str] = []  # 允许导出投票数据的用户名
+    export_chunk_size: int = 5000  # 导出时每次从数据库读取的行数
+
+    @field_validator("character_snapshot_path")
+    @classmethod
+    def _resolve_paths(cls, value: str) -> str:
+        return _resolve_path(value)
+
+
+class GithubSettings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
+    release_ttl: int = 60  # 缓存有效期（秒）
+    error_backoff: int = 30  # 首次失败后的等待时间（秒），也用于版本清单刷新失败后的重试
+    max_error_backoff: int = 900
+    token: str = ""
+    manifest_path: str = "./.database/releases.json"  # 最近版本清单的本地文件
+    manifest_refresh_interval: float = 300
+    manifest_size: int = 10  # 清单中保留的最近版本数
+
+    @field_validator("manifest_path")
+    @classmethod
+    def _resolve_paths(cls, value: str) -> str:
+        return _resolve_path(value)
+
+
+class SendCodeRateLimitSettings(BaseModel):
+    # 所有请求共享的总量上限，超出时直接拒绝，保护后端整体
+    total: RateLimitRule = RateLimitRule(capacity=50, period=10)
+    per_ip: RateLimitRule = RateLimitRule(capacity=10, period=600)
+    per_email: RateLimitRule = RateLimitRule(capacity=3, period=900)
+
+
+class RateLimitSettings(BaseModel):
+    max_keys: int = 100000  # 每个限流器最多跟踪的键数量
+    trust_forwarded_for: bool = False  # 部署在反向代理之后时，使用 X-Forwarded-For 中的客户端 IP
+    trusted_proxies: int = 1  # 请求依次经过的受信任代理层数
+    send_code: SendCodeRateLimitSettings = SendCodeRateLimitSettings()
+
+
+class ServerSettings(BaseModel):
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    sync_interval: float = 2  # 各工作进程检查共享缓存更新的间隔（秒）
+
+
+class StaticSettings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
+    docs_dir: str = "./frontend/docs"
+    reload_interval: float = 5  # 检查文件变化的间隔（秒）
+
+    @field_validator("docs_dir")
+    @classmethod
+    def _resolve_paths(cls, value: str) -> str:
+        return _resolve_path(value)
+
+
+class ProfilingSettings(BaseModel):
+    model_config = ConfigDict(validate_default=True)
+
+    enabled: bool = False
+    sample_rate: float = 0.01  # 匹配 routes 的请求中被采样的比例
+    routes: list[str] = []  # 路径，支持通配符，如 "/api/vote/character/*"
+    token: str = ""  # 非空时，携带 X-Profile: <token> 请求头的请求总会被采样
+    interval_ms: float = 5  # 采样间隔
+    output_dir: str = "./.profiles"
+    max_files: int = 200
+
+    @field_validator("output_dir")
+    @classmethod
+    def _resolve_paths(cls, value: str) -> str:
+        return _resolve_path(value)
+
+
+class OutboundSettings(BaseModel):
+    timeout: float = 10  # 默认超时（秒）
+    connect_timeout: float = 5
+    host_timeouts: dict[str, float] = {}  # 按主机名单独设置超时
+    http2: bool = True  # 需要安装 h2，否则使用 HTTP/1.1
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 60
+    max_retries: int = 2
+    retry_backoff: float = 0.5  # 首次重试前的最长等待时间（秒），之后翻倍，实际等待在其中随机取值
+    max_retry_backoff: float = 5
+    breaker_threshold: int = 5  # 连续失败多少次后熔断
+    breaker_reset: float = 30  # 熔断后多久放行一个试探请求（秒）
+
+
+class LoggingSettings(BaseModel):
+    level: str = "INFO"
+    format: str = "text"  # text 或 json
+    levels: dict[str, str] = {}  # 按 logger 名称单独设置级别
+    # 按 logger 名称设置采样比例，用于每个请求都会记录的高频事件
+    sample_rates: dict[str, float] = {"backend.src.github.release_api.requests": 0.01}
+    redact: bool = True  # 隐去验证码、token 等敏感字段，本地调试时可关闭以查看验证码
+    queue_size: int = 10000  # 等待输出的记录上限，超出后丢弃
+
+
+class Settings(BaseModel):
+    aliyun: AliyunSettings
+    database: DatabaseSettings
+    auth: AuthSettings = AuthSettings()
+    vote: VoteSettings = VoteSettings()
+    github: GithubSettings = GithubSettings()
+    rate_limit: RateLimitSettings = RateLimitSettings()
+    server: ServerSettings = ServerSettings()
+    static: StaticSettings = StaticSettings()
+    profiling: ProfilingSettings = ProfilingSettings()
+    outbound: OutboundSettings = OutboundSettings()
+    logging: LoggingSettings = LoggingSettings()
+
+
+def config_path() -> Path:
+    """配置文件路径，可通过环境变量 ZSIM_CONFIG 覆盖"""
+    return Path(os.environ.get(CONFIG_ENV_VAR, BACKEND_DIR / "config.toml"))
+
+
+@functools.cache
+def get_settings() -> Settings:
+    """首次调用时读取并校验配置文件，之后返回同一个对象"""
+    with open(config_path(), "rb") as f:
+        return Settings.model_validate(tomllib.load(f))
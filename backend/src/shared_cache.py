@@ -0,0 +1,190 @@
+import os
+import socket
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from .db import SQLitePool
+from .metrics import timed_query
+
+# 当前工作进程的标识，用于租约归属
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class SharedEntry:
+    version: int
+    payload: bytes
+    updated_at: float
+
+
+class SharedCache:
+    """
+    多个工作进程共享的缓存，存放在独立的 SQLite 文件中。
+
+    - entries：按 key 发布的数据，每次发布版本号加一；各进程只需比较版本号即可判断是否需要重新加载
+    - leases：带过期时间的租约，保证同一时间只有一个进程去访问外部服务
+    - events：只追加的事件流（如注销的 token），各进程按序号增量读取
+    """
+
+    def __init__(self):
+        self.pool = SQLitePool(read_pool_size=1)
+        self._failures: dict[str, int] = {}  # 本进程每个租约连续刷新失败的次数
+
+    async def open(self, db_path: str):
+        await self.pool.open(db_path)
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    payload BLOB NOT NULL,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    until REAL NOT NULL
+                )"""
+            )
+            await conn.execute(
+                """CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    channel TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )"""
+            )
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_events_channel_seq ON events(channel, seq)")
+
+    async def close(self):
+        await self.pool.close()
+
+    @timed_query("shared", "entry_version")
+    async def version(self, key: str) -> int:
+        """已发布数据的版本号，从未发布时为 0"""
+        async with self.pool.reader() as conn:
+            async with conn.execute("SELECT version FROM entries WHERE key = ?", (key,)) as cursor:
+                row = await cursor.fetchone()
+        return row["version"] if row else 0
+
+    @timed_query("shared", "get_entry")
+    async def get(self, key: str, newer_than: int = 0) -> SharedEntry | None:
+        """读取已发布的数据；版本号不大于 newer_than 时返回 None，避免重复传输未变化的数据"""
+        async with self.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT version, payload, updated_at FROM entries WHERE key = ? AND version > ?",
+                (key, newer_than),
+            ) as cursor:
+                row = await cursor.fetchone()
+        if row is None:
+            return None
+        return SharedEntry(row["version"], row["payload"], row["updated_at"])
+
+    @timed_query("shared", "publish_entry")
+    async def publish(self, key: str, payload: bytes) -> int:
+        """发布新数据并返回新的版本号"""
+        async with self.pool.writer() as conn:
+            async with conn.execute(
+                "INSERT INTO entries (key, version, payload, updated_at) VALUES (?, 1, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET version = version + 1, payload = excluded.payload, "
+                "updated_at = excluded.updated_at RETURNING version",
+                (key, payload, time.time()),
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row["version"]
+
+    @timed_query("shared", "claim_lease")
+    async def claim(self, name: str, ttl: float, owner: str = WORKER_ID) -> bool:
+        """
+        尝试获取租约，有效期 ttl 秒，租约空闲或已过期时获取成功。
+
+        租约到期前不会被释放（持有者自己也不能提前续期，只能用 shorten 提前到期），
+        因此也可以用作“所有进程合计每 ttl 秒只做一次”的调度。
+        """
+        now = time.time()
+        async with self.pool.writer() as conn:
+            async with conn.execute(
+                "INSERT INTO leases (name, owner, until) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, until = excluded.until "
+                "WHERE leases.until <= ? RETURNING owner",
+                (name, owner, now + ttl, now),
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row is not None
+
+    @timed_query("shared", "shorten_lease")
+    async def shorten(self, name: str, ttl: float, owner: str = WORKER_ID):
+        """把本进程持有的租约改为 ttl 秒后到期，只会提前不会延长；用于操作失败后提前重试"""
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "UPDATE leases SET until = MIN(until, ?) WHERE name = ? AND owner = ?",
+                (time.time() + ttl, name, owner),
+            )
+
+    async def refresh_leased(
+        self,
+        key: str,
+        ttl: float,
+        refresh: Callable[[], Awaitable[bytes | None]],
+        retry_backoff: float,
+        max_retry_backoff: float,
+    ) -> int | None:
+        """
+        获得名为 key 的租约后调用 refresh，把它返回的数据发布到 key 下并返回新的版本号。
+
+        未获得租约或 refresh 返回 None（数据没有变化）时返回 None。refresh 抛出异常时，
+        租约按本进程连续失败的次数指数退避提前到期（retry_backoff 起翻倍，不超过
+        max_retry_backoff 和 ttl），再把异常抛出，不必等满 ttl 才重试。
+        """
+        if not await self.claim(key, ttl):
+            return None
+        try:
+            payload = await refresh()
+        except Exception:
+            failures = self._failures[key] = self._failures.get(key, 0) + 1
+            await self.shorten(key, min(retry_backoff * 2 ** (failures - 1), max_retry_backoff, ttl))
+            raise
+        self._failures.pop(key, None)
+        if payload is None:
+            return None
+        return await self.publish(key, payload)
+
+    @timed_query("shared", "append_event")
+    async def append_event(self, channel: str, value: str):
+        async with self.pool.writer() as conn:
+            await conn.execute(
+                "INSERT INTO events (channel, value, created_at) VALUES (?, ?, ?)",
+                (channel, value, time.time()),
+            )
+
+    @timed_query("shared", "events_since")
+    async def events_since(self, channel: str, seq: int) -> list[tuple[int, str]]:
+        """返回序号大于 seq 的事件 (seq, value)，按序号升序"""
+        async with self.pool.reader() as conn:
+            async with conn.execute(
+                "SELECT seq, value FROM events WHERE channel = ? AND seq > ? ORDER BY seq",
+                (channel, seq),
+            ) as cursor:
+                return [(row["seq"], row["value"]) for row in await cursor.fetchall()]
+
+    async def last_event_seq(self, channel: str) -> int:
+        async with self.pool.reader() as conn:
+            async with conn.execute("SELECT MAX(seq) FROM events WHERE channel = ?", (channel,)) as cursor:
+                row = await cursor.fetchone()
+        return row[0] or 0
+
+    @timed_query("shared", "prune_events")
+    async def prune_events(self, channel: str, older_than: float) -> int:
+        """删除通道中早于 older_than（时间戳）的事件"""
+        async with self.pool.writer() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM events WHERE channel = ? AND created_at < ?",
+                (channel, older_than),
+            )
+            return cursor.rowcount
+
+
+shared_cache = SharedCache()
@@ -0,0 +1,32 @@
+import asyncio
+import signal
+import threading
+from typing import Callable
+
+HANDLED_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+def on_shutdown_signal(callback: Callable[[], None]):
+    """
+    收到 SIGINT / SIGTERM 时在事件循环中调用 callback，再交给原有的处理函数（如 uvicorn 的）。
+
+    uvicorn 收到退出信号后要等所有连接结束才执行 lifespan 的关闭阶段，而票数推送这类长连接
+    不会自行结束；借此在服务器开始关闭时就通知它们结束。信号只能在主线程中处理，
+    在其他线程中运行时（如测试客户端）不做任何事。服务器退出时会恢复它自己安装前的处理函数。
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    loop = asyncio.get_running_loop()
+    for sig in HANDLED_SIGNALS:
+        previous = signal.getsignal(sig)
+
+        def handler(signum, frame, previous=previous):
+            loop.call_soon_threadsafe(callback)
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                # 没有其他处理函数时按默认行为退出
+                signal.signal(signum, signal.SIG_DFL)
+                signal.raise_signal(signum)
+
+        signal.signal(sig, handler)
@@ -0,0 +1,207 @@
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+from dataclasses import dataclass, field
+
+from fastapi import APIRouter, Header, HTTPException, Response
+
+from .metrics import cache_events_total
+from .settings import get_settings
+
+try:
+    import brotli
+except ImportError:  # 未安装 brotli 时只提供 gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
+DATASETS = ("avatars", "buddy", "equipment_suits", "weapons")
+DOCS = ("doc.en", "doc.zh")
+
+
+@dataclass
+class StaticAsset:
+    path: str
+    media_type: str
+    etag: str = ""
+    # 内容编码 -> 数据，identity 为原始内容
+    variants: dict[str, bytes] = field(default_factory=dict)
+    signature: tuple[int, int] = (0, 0)  # (mtime_ns, size)，用于发现文件变化
+
+
+def _file_signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _compress(content: bytes) -> dict[str, bytes]:
+    variants = {"identity": content}
+    # mtime=0 保证相同内容每次压缩结果一致
+    compressed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(compressed) < len(content):
+        variants["gzip"] = compressed
+    if brotli is not None:
+        compressed = brotli.compress(content, quality=11)
+        if len(compressed) < len(content):
+            variants["br"] = compressed
+    return variants
+
+
+def _accepted_encodings(accept_encoding: str | None) -> set[str]:
+    """解析 Accept-Encoding，返回 q 值大于 0 的编码"""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+class StaticAssetStore:
+    """
+    静态数据集和文档的内存缓存。
+
+    启动时读取文件并预先压缩为 gzip（以及可用时的 brotli），按内容哈希生成强 ETag；
+    请求时只做 Accept-Encoding 协商和 If-None-Match 比较，不读文件也不压缩。
+    后台任务定期检查文件的修改时间和大小，有变化时重新构建对应条目。
+    """
+
+    def __init__(self):
+        self.assets: dict[str, StaticAsset] = {}
+        self.reload_interval: float = 5
+        self._task: asyncio.Task | None = None
+
+    def add(self, name: str, path: str, media_type: str):
+        self.assets[name] = StaticAsset(path=path, media_type=media_type)
+
+    @staticmethod
+    def _build(asset: StaticAsset) -> StaticAsset | None:
+        """读取并压缩文件，返回新的条目；文件没有变化或不存在时返回 None"""
+        try:
+            signature = _file_signature(asset.path)
+        except FileNotFoundError:
+            return None
+        if signature == asset.signature:
+            return None
+        with open(asset.path, "rb") as f:
+            content = f.read()
+        return StaticAsset(
+            path=asset.path,
+            media_type=asset.media_type,
+            etag=hashlib.sha256(content).hexdigest()[:32],
+            variants=_compress(content),
+            signature=signature,
+        )
+
+    def build_all(self) -> list[str]:
+        """重新构建所有发生变化的条目，返回其名称；新条目整体替换旧条目，请求不会读到一半更新的数据"""
+        rebuilt = []
+        for name, asset in list(self.assets.items()):
+            if (new_asset := self._build(asset)) is not None:
+                self.assets[name] = new_asset
+                rebuilt.append(name)
+        return rebuilt
+
+    async def start(self):
+        await asyncio.to_thread(self.build_all)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                if reloaded := await asyncio.to_thread(self.build_all):
+                    logger.info("Reloaded static assets", extra={"assets": reloaded})
+            except Exception:
+                logger.exception("Error reloading static assets")
+
+    def response(self, name: str, accept_encoding: str | None, if_none_match: str | None) -> Response:
+        asset = self.assets.get(name)
+        if asset is None or not asset.variants:
+            raise HTTPException(status_code=404, detail="文件不存在")
+
+        accepted = _accepted_encodings(accept_encoding)
+        encoding = next((coding for coding in ("br", "gzip") if coding in accepted and coding in asset.variants), None)
+        # 不同编码的表示使用不同的强 ETag，便于缓存区分；比较时只看内容哈希
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/").strip('"').split("-")[0] for tag in if_none_match.split(",")}
+            if asset.etag in tags or "*" in tags:
+                cache_events_total.inc(cache="static", event="not_modified")
+                return Response(status_code=304, headers=headers)
+
+        cache_events_total.inc(cache="static", event="hit")
+        return Response(
+            content=asset.variants[encoding or "identity"],
+            media_type=asset.media_type,
+            headers=headers,
+        )
+
+
+store = StaticAssetStore()
+for _name in DATASETS:
+    store.add(_name, os.path.join(ASSETS_DIR, f"{_name}.json"), "application/json")
+
+
+async def start_static_assets():
+    """构建静态文件缓存并启动文件变化检查"""
+    settings = get_settings().static
+    for name in DOCS:
+        store.add(name, os.path.join(settings.docs_dir, f"{name}.md"), "text/markdown; charset=utf-8")
+    store.reload_interval = settings.reload_interval
+    await store.start()
+
+
+async def stop_static_assets():
+    await store.stop()
+
+
+@router.get("/data/{name}", tags=["Static"])
+async def get_dataset(
+    name: str,
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """角色、邦布、驱动盘和音擎数据集：avatars / buddy / equipment_suits / weapons"""
+    if name not in DATASETS:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return store.response(name, accept_encoding, if_none_match)
+
+
+@router.get("/docs/{name}", tags=["Static"])
+async def get_doc(
+    name: str,
+    accept_encoding: str | None = Header(None),
+    if_none_match: str | None = Header(None),
+):
+    """快速入门文档：doc.en / doc.zh"""
+    if name not in DOCS:
+        raise HTTPException(status_code=404, detail="文件不存在")
+    return store.response(name, accept_encoding, if_none_match)
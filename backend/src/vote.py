@@ -1,67 +1,283 @@
+import asyncio
+import hashlib
 import json
+import logging
 import os
-import tomllib
-from io import StringIO
+from typing import TYPE_CHECKING, Callable, Literal
 
-import aiosqlite
-import httpx
-import polars as pl
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 
 from .auth import get_current_user
-
+from .character_details import CharacterDetailsStore
+from .db import SQLitePool
+from .metrics import cache_events_total, register_gauge
+from .ranking import VoteRanking
+from .settings import get_settings
+from .shared_cache import shared_cache
+from .shutdown import on_shutdown_signal
+from .vote_export import export_csv, export_parquet
+from .vote_ingest import VoteIngestor
+from .vote_stream import VoteBroadcaster
+
+# Polars 的导入开销较大，在第一次需要筛选或排序时才导入
+if TYPE_CHECKING:
+    import polars as pl
+
+logger = logging.getLogger(__name__)
 router = APIRouter()
 
-with open("backend/config.toml", "rb") as f:
-    config = tomllib.load(f)
-    DB_PATH = config["database"]["vote_db_path"]
 AVATARS_PATH = os.path.join(os.path.dirname(__file__), "assets", "avatars.json")
+MAX_BATCH_VOTES = 100  # 单次批量投票的角色数量上限
+# 可用于筛选的整数列：角色支持度、动作建模、Buff支持
+CATALOG_FILTER_COLUMNS = ("character_support", "action_modeling", "buff_support")
+
+# Characters data, loaded by init_vote_db on startup
+CHARACTERS_DATA: list[dict] = []
 
-# Load characters data into memory on startup
-try:
-    with open(AVATARS_PATH, "r", encoding="utf-8") as f:
-        CHARACTERS_DATA: list[dict] = json.load(f)
-except (FileNotFoundError, json.JSONDecodeError):
-    CHARACTERS_DATA = []
+pool = SQLitePool()
+ingestor = VoteIngestor(pool)
+register_gauge("vote_ingest_pending", "Accepted votes not yet written to SQLite", lambda: ingestor.pending)
 
-# Load character details from GitHub CSV
+# Character details from the GitHub CSV, kept in sync by details_store
 CHARACTER_DETAILS: list[dict] = []
 
 
-async def fetch_character_details():
-    """从GitHub获取并解析角色详细数据CSV文件"""
-    global CHARACTER_DETAILS
-    csv_url = "https://raw.githubusercontent.com/LoTwT/ZSim/refs/heads/main/zsim/data/character.csv"
+class CharactersCache:
+    """
+    /vote/characters 的响应缓存。
+
+    合并后的角色列表常驻内存，投票时只就地更新对应角色的票数；
+    ETag 是响应体的内容哈希，票数相同的工作进程返回相同的 ETag，
+    客户端携带 If-None-Match 轮询时无需访问数据库，经不同进程轮询也不会误判为有变化。
+    票数变化时调用 on_votes（角色 ID -> 最新票数），用于推送给订阅者。
+    """
+
+    def __init__(self, on_votes: Callable[[dict[int, int]], None] | None = None):
+        self.on_votes = on_votes
+        self.items: list[dict] = []
+        self._index: dict[int, dict] = {}
+        self._body: bytes | None = None
+        self._etag: str | None = None
+        self._catalog: "pl.DataFrame | None" = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.items)
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = f'"{hashlib.sha256(self.body()).hexdigest()[:32]}"'
+        return self._etag
+
+    def not_modified(self, if_none_match: str | None) -> bool:
+        """If-None-Match 是否与当前 ETag 匹配，按弱比较忽略 W/ 前缀，* 匹配任意版本"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return self.etag in tags or "*" in tags
+
+    def rebuild(self, votes_map: dict[int, int] | None = None):
+        """
+        根据 CHARACTERS_DATA 和 CHARACTER_DETAILS 重新生成合并列表。
 
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(csv_url)
-            response.raise_for_status()
-
-            # 使用 Polars 解析CSV内容
-            df = pl.read_csv(StringIO(response.text))
-
-            # 添加角色支持度计算
-            df_with_support = df.with_columns(
-                pl.when((pl.col("动作建模") >= 1) & (pl.col("Buff支持") >= 1) & (pl.col("影画支持") >= 1))
-                .then(pl.lit(1))
-                .when((pl.col("动作建模") >= 0) & (pl.col("Buff支持") >= 0))
-                .then(pl.lit(0))
-                .otherwise(pl.lit(-1))
-                .alias("角色支持度")
+        未传入 votes_map 时沿用当前缓存中的票数，它们比数据库中的更新。
+        """
+        if votes_map is None:
+            votes_map = {cid: item["votes"] for cid, item in self._index.items()}
+
+        # 创建角色详细数据的映射，使用CID作为键
+        character_details_map = {}
+        for detail in CHARACTER_DETAILS:
+            cid = detail.get("CID")
+            if cid is not None:
+                character_details_map[cid] = detail
+
+        """
+        # 映射规则
+        # 将支持度数值转换为图标
+        def map_support_to_icon(value: float | int) -> str:
+        if value >= 1:
+            return "✅ 完全"
+        elif value <= -1:
+            return "❌ 不支持"
+        else:
+            return "⚠️ 不完全"
+        """
+        items = []
+        for char in CHARACTERS_DATA:
+            # 从 CHARACTER_DETAILS 中获取额外信息，使用CID匹配
+            detail = character_details_map.get(char["id"])
+            items.append(
+                {
+                    "id": char["id"],
+                    "name": char["name"],
+                    "name_en": char["name_en"],
+                    "avatar": char["icon"][0] if char.get("icon") else "",
+                    "votes": votes_map.get(char["id"], 0),
+                    "action_modeling": detail.get("动作建模", "") if detail else "",
+                    "buff_support": detail.get("Buff支持", "") if detail else "",
+                    "cinema_support": detail.get("影画支持", "") if detail else "",
+                    "frame_counting": detail.get("精细测帧", "") if detail else "",
+                    "character_support": detail.get("角色支持度", "") if detail else "",
+                }
+            )
+
+        self.items = items
+        self._index = {item["id"]: item for item in items}
+        ranking.reset(self.votes())
+        self._body = self._etag = None
+        self._catalog = None
+
+    def set_votes(self, votes_map: dict[int, int]):
+        """用最新的票数校正缓存，只有票数确实变化时才重新生成响应体和 ETag"""
+        changed = {}
+        for cid, item in self._index.items():
+            votes = votes_map.get(cid, 0)
+            if item["votes"] != votes:
+                item["votes"] = changed[cid] = votes
+        if changed:
+            self._body = self._etag = None
+            if self.on_votes is not None:
+                self.on_votes(changed)
+
+    def item(self, character_id: int) -> dict | None:
+        return self._index.get(character_id)
+
+    def add_votes(self, character_id: int, delta: int = 1):
+        """只更新发生变化的角色票数"""
+        item = self._index.get(character_id)
+        if item is None:
+            return
+        item["votes"] += delta
+        self._body = self._etag = None
+        if self.on_votes is not None:
+            self.on_votes({character_id: item["votes"]})
+
+    def votes(self) -> dict[int, int]:
+        return {cid: item["votes"] for cid, item in self._index.items()}
+
+    def body(self) -> bytes:
+        """序列化后的响应体，票数不变时只序列化一次"""
+        if self._body is None:
+            self._body = json.dumps(self.items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self._body
+
+    def catalog(self) -> "pl.DataFrame":
+        """
+        用于筛选和排序的列式角色表，每次 rebuild 后首次使用时构建。
+
+        row 列是 items 中的下标；缺失的详细数据为 null。票数变化频繁，不存放在表中，查询时再拼接。
+        """
+        if self._catalog is None:
+            import polars as pl
+
+            def int_column(key: str) -> list[int | None]:
+                return [item[key] if isinstance(item[key], int) else None for item in self.items]
+
+            self._catalog = pl.DataFrame(
+                {
+                    "row": range(len(self.items)),
+                    "id": [item["id"] for item in self.items],
+                    "name": [item["name"] for item in self.items],
+                    "name_en": [item["name_en"] for item in self.items],
+                    **{key: int_column(key) for key in CATALOG_FILTER_COLUMNS},
+                },
+                schema_overrides={key: pl.Int64 for key in CATALOG_FILTER_COLUMNS},
             )
+        return self._catalog
+
+    def query(
+        self,
+        sort: str,
+        descending: bool,
+        filters: dict[str, list[int]],
+        offset: int,
+        limit: int | None,
+    ) -> tuple[int, bytes]:
+        """在列式表上完成筛选、排序和分页，返回 (符合条件的总数, 响应体)"""
+        import polars as pl
+
+        df = self.catalog().with_columns(pl.Series("votes", [item["votes"] for item in self.items], dtype=pl.Int64))
+        if filters:
+            df = df.filter(*(pl.col(key).is_in(values) for key, values in filters.items()))
+        # 以角色 ID 作为次要排序键，保证分页结果稳定
+        df = df.sort([sort, "id"], descending=[descending, False], nulls_last=True)
+        rows = df["row"].slice(offset, limit).to_list()
+        body = json.dumps([self.items[row] for row in rows], ensure_ascii=False, separators=(",", ":"))
+        return df.height, body.encode("utf-8")
+
+
+def _on_votes_changed(votes: dict[int, int]):
+    ranking.update(votes)
+    broadcaster.publish(votes)
+
+
+ranking = VoteRanking()
+characters_cache = CharactersCache(on_votes=_on_votes_changed)
+broadcaster = VoteBroadcaster(characters_cache.votes)
+register_gauge(
+    "vote_stream",
+    "Live vote stream subscribers and messages",
+    lambda: {(key,): value for key, value in broadcaster.stats().items()},
+    ("stat",),
+)
+
+
+def _on_character_details_updated(details: list[dict]):
+    global CHARACTER_DETAILS
+    CHARACTER_DETAILS = details
+    characters_cache.rebuild()
+
 
-            CHARACTER_DETAILS = df_with_support.to_dicts()
+details_store = CharacterDetailsStore(shared_cache, on_update=_on_character_details_updated)
+_vote_sync_task: asyncio.Task | None = None
 
-    except Exception as e:
-        print(f"Error fetching character details: {e}")
-        CHARACTER_DETAILS = []
+
+def load_characters_data():
+    """读取 avatars.json；原地替换列表内容，保证已导入的引用仍然有效"""
+    try:
+        with open(AVATARS_PATH, "r", encoding="utf-8") as f:
+            CHARACTERS_DATA[:] = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        CHARACTERS_DATA.clear()
+
+
+async def _sync_votes(interval: float):
+    """
+    多进程部署时，其他进程接受的投票只会出现在数据库中；
+    定期用数据库票数加上本进程未落盘的票数校正缓存，使各进程返回的票数保持一致。
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            characters_cache.set_votes(await ingestor.vote_counts())
+        except Exception:
+            logger.exception("Error syncing vote counts")
+
+
+async def close_vote_db():
+    """写入尚未落盘的投票并关闭投票数据库连接池"""
+    global _vote_sync_task
+    if _vote_sync_task is not None:
+        _vote_sync_task.cancel()
+        try:
+            await _vote_sync_task
+        except asyncio.CancelledError:
+            pass
+        _vote_sync_task = None
+    await broadcaster.stop()
+    await ingestor.stop()
+    await pool.close()
 
 
 async def init_vote_db():
     """初始化投票数据库和表"""
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    async with aiosqlite.connect(DB_PATH) as conn:
+    settings = get_settings()
+    await pool.open(settings.database.vote_db_path, settings.database.read_pool_size)
+    async with pool.writer() as conn:
         # 存储每个角色的票数
         await conn.execute(
             """CREATE TABLE IF NOT EXISTS character_votes (
@@ -77,115 +293,214 @@ async def init_vote_db():
                 PRIMARY KEY (username, character_id)
             )"""
         )
-        await conn.commit()
+        # 按角色统计投票用户；用户维度的查询已由主键覆盖
+        await conn.execute("CREATE INDEX IF NOT EXISTS idx_user_votes_character ON user_votes(character_id, username)")
+
+    ingestor.flush_interval = settings.vote.flush_interval_ms / 1000
+    ingestor.batch_size = max(1, settings.vote.flush_batch_size)
+    ingestor.sync_ttl = settings.server.sync_interval
+    await ingestor.start()
+
+    load_characters_data()
+    characters_cache.rebuild(await ingestor.vote_counts())
+
+    global _vote_sync_task
+    _vote_sync_task = asyncio.create_task(_sync_votes(settings.server.sync_interval))
+
+    broadcaster.window = settings.vote.stream_window_ms / 1000
+    broadcaster.buffer_size = settings.vote.stream_buffer_size
+    broadcaster.keepalive = settings.vote.stream_keepalive
+    await broadcaster.start()
+    # 长连接会阻止服务器关闭，收到退出信号时就结束推送，不等到 lifespan 的关闭阶段
+    on_shutdown_signal(broadcaster.close_streams)
 
-    # 初始化角色详细数据
-    await fetch_character_details()
+
+async def start_character_details_refresh():
+    """后台加载角色详细数据：先读本地快照，再定期从 GitHub 刷新，不阻塞启动"""
+    settings = get_settings()
+    details_store.snapshot_path = settings.vote.character_snapshot_path
+    details_store.refresh_interval = settings.vote.character_refresh_interval
+    details_store.retry_backoff = settings.vote.character_retry_backoff
+    details_store.max_retry_backoff = settings.vote.character_max_retry_backoff
+    details_store.sync_interval = settings.server.sync_interval
+    await details_store.start()
+
+
+async def stop_character_details_refresh():
+    """停止角色详细数据的后台刷新，须在关闭出站客户端之前调用"""
+    await details_store.stop()
+
+
+class BatchVoteRequest(BaseModel):
+    """批量投票请求模型"""
+
+    character_ids: list[int] = Field(..., description="角色 ID 列表", min_length=1, max_length=MAX_BATCH_VOTES)
 
 
 @router.get("/vote/user_votes", tags=["Vote"])
 async def get_user_votes(current_user: str = Depends(get_current_user)):
     """获取当前用户的投票记录"""
-    async with aiosqlite.connect(DB_PATH) as conn:
-        async with conn.execute("SELECT character_id FROM user_votes WHERE username = ?", (current_user,)) as cursor:
-            rows = await cursor.fetchall()
-            return [row[0] for row in rows]
+    return sorted(await ingestor.sync_user(current_user))
 
 
-@router.get("/vote/characters", tags=["Vote"])
-async def get_characters_with_votes():
-    """获取所有角色及其票数"""
-    if not CHARACTERS_DATA:
-        raise HTTPException(status_code=500, detail="角色数据文件未找到或加载失败")
+@router.get("/vote/user_votes/history", tags=["Vote"])
+async def get_user_vote_history(
+    after: int = Query(0, description="上一页最后一个角色 ID"),
+    limit: int = Query(50, ge=1, le=200),
+    current_user: str = Depends(get_current_user),
+):
+    """分页获取当前用户的投票记录，next 为下一页的 after 参数，没有更多记录时为 null"""
+    items = await ingestor.user_votes_page(current_user, after, limit)
+    return {"items": items, "next": items[-1] if len(items) == limit else None}
 
-    """获取所有角色详细数据"""
-    if not CHARACTER_DETAILS:
-        # 如果数据为空，尝试重新获取
-        await fetch_character_details()
 
-    if not CHARACTER_DETAILS:
-        raise HTTPException(status_code=500, detail="角色详细数据获取失败")
+@router.get("/vote/ranking", tags=["Vote"])
+async def get_ranking(limit: int = Query(10, ge=1, le=100)):
+    """票数排名前 limit 的角色；每个用户对每个角色只能投一票，票数即投票人数"""
+    result = []
+    for rank, cid, votes in ranking.top(limit):
+        item = characters_cache.item(cid)
+        result.append(
+            {
+                "rank": rank,
+                "id": cid,
+                "name": item["name"] if item else "",
+                "name_en": item["name_en"] if item else "",
+                "votes": votes,
+            }
+        )
+    return result
 
-    async with aiosqlite.connect(DB_PATH) as conn:
-        conn.row_factory = aiosqlite.Row
-        async with conn.execute("SELECT * FROM character_votes") as cursor:
-            votes_rows = await cursor.fetchall()
-            votes_map = {row["character_id"]: row["votes"] for row in votes_rows}
 
-    characters_with_votes = CHARACTERS_DATA[:]
+@router.get("/vote/ranking/{character_id}", tags=["Vote"])
+async def get_character_rank(character_id: int):
+    """指定角色的名次和票数"""
+    rank = ranking.rank(character_id)
+    if rank is None:
+        raise HTTPException(status_code=404, detail="角色不存在")
+    return {"id": character_id, "rank": rank, "votes": ranking.votes(character_id), "total": len(ranking)}
 
-    # 创建角色详细数据的映射，使用CID作为键
-    character_details_map = {}
-    for detail in CHARACTER_DETAILS:
-        cid = detail.get("CID")
-        if cid is not None:
-            character_details_map[cid] = detail
 
-    for char in characters_with_votes:
-        char["votes"] = votes_map.get(char["id"], 0)
-        char["icon_url"] = char["icon"][0] if char.get("icon") else ""
+@router.get("/vote/character/{character_id}/voters", tags=["Vote"])
+async def get_character_voter_count(character_id: int):
+    """为指定角色投票的用户数，直接统计投票记录，包含其他工作进程已写入的投票"""
+    if characters_cache.item(character_id) is None:
+        raise HTTPException(status_code=404, detail="角色不存在")
+    return {"id": character_id, "voters": await ingestor.voter_count(character_id)}
 
-    result = []
-    for char in characters_with_votes:
-        # 从 CHARACTER_DETAILS 中获取额外信息，使用CID匹配
-        detail = character_details_map.get(char["id"])
 
-        """
-        # 映射规则
-        # 将支持度数值转换为图标
-        def map_support_to_icon(value: float | int) -> str:
-        if value >= 1:
-            return "✅ 完全"
-        elif value <= -1:
-            return "❌ 不支持"
-        else:
-            return "⚠️ 不完全"
-        """
-        char_result = {
-            "id": char["id"],
-            "name": char["name"],
-            "name_en": char["name_en"],
-            "avatar": char["icon_url"],
-            "votes": char["votes"],
-            "action_modeling": detail.get("动作建模", "") if detail else "",
-            "buff_support": detail.get("Buff支持", "") if detail else "",
-            "cinema_support": detail.get("影画支持", "") if detail else "",
-            "frame_counting": detail.get("精细测帧", "") if detail else "",
-            "character_support": detail.get("角色支持度", "") if detail else "",
-        }
-        result.append(char_result)
+@router.get("/vote/characters", tags=["Vote"])
+async def get_characters_with_votes(
+    sort: Literal["id", "votes", "name", "name_en"] | None = Query(None, description="排序字段"),
+    order: Literal["asc", "desc"] | None = Query(None, description="默认 votes 降序，其他字段升序"),
+    character_support: list[int] | None = Query(None, description="角色支持度，可重复传入多个值"),
+    action_modeling: list[int] | None = Query(None, description="动作建模"),
+    buff_support: list[int] | None = Query(None, description="Buff支持"),
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=1000),
+    if_none_match: str | None = Header(None),
+):
+    """
+    获取角色及其票数。
+
+    不带查询参数时返回完整列表；带排序、筛选或分页参数时只返回需要的行，
+    符合条件的总数在 X-Total-Count 响应头中。
+    """
+    if not CHARACTERS_DATA:
+        raise HTTPException(status_code=500, detail="角色数据文件未找到或加载失败")
 
-    return result
+    # 角色详细数据尚未就绪时（无快照且首次刷新未完成），详细字段返回空值，不在请求中等待网络
+    # 任何参数组合的结果都只取决于缓存内容，因此共用同一个 ETag
+    etag = characters_cache.etag
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if characters_cache.not_modified(if_none_match):
+        cache_events_total.inc(cache="characters", event="not_modified")
+        return Response(status_code=304, headers=headers)
+
+    filters = {
+        key: values
+        for key, values in zip(CATALOG_FILTER_COLUMNS, (character_support, action_modeling, buff_support))
+        if values
+    }
+    if sort is None and not filters and offset == 0 and limit is None:
+        cache_events_total.inc(cache="characters", event="hit")
+        return Response(content=characters_cache.body(), media_type="application/json", headers=headers)
+
+    sort = sort or "id"
+    descending = order == "desc" if order else sort == "votes"
+    total, body = characters_cache.query(sort, descending, filters, offset, limit)
+    cache_events_total.inc(cache="characters", event="query")
+    headers["X-Total-Count"] = str(total)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get("/vote/stream", tags=["Vote"])
+async def stream_votes():
+    """
+    票数变化的 SSE 推送。
+
+    连接后先收到 snapshot 事件（{角色 ID: 票数}），之后只收到 votes 事件（发生变化的角色及其最新票数）。
+    """
+    if not characters_cache.ready:
+        raise HTTPException(status_code=503, detail="角色数据尚未就绪")
+    return StreamingResponse(
+        broadcaster.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/vote/character/{character_id}", tags=["Vote"])
 async def vote_for_character(character_id: int, current_user: str = Depends(get_current_user)):
     """为指定角色投票"""
-    async with aiosqlite.connect(DB_PATH) as conn:
-        # 检查用户是否已投票
-        async with conn.execute(
-            "SELECT 1 FROM user_votes WHERE username = ? AND character_id = ?",
-            (current_user, character_id),
-        ) as cursor:
-            if await cursor.fetchone():
-                raise HTTPException(status_code=400, detail="您已经投过票了")
-
-        # 开启事务
-        async with conn.execute("BEGIN") as cursor:
-            try:
-                # 增加角色票数
-                await conn.execute(
-                    "INSERT INTO character_votes (character_id, votes) VALUES (?, 1) ON CONFLICT(character_id) DO UPDATE SET votes = votes + 1",
-                    (character_id,),
-                )
-                # 记录用户投票
-                await conn.execute(
-                    "INSERT INTO user_votes (username, character_id) VALUES (?, ?)",
-                    (current_user, character_id),
-                )
-                await conn.commit()
-            except aiosqlite.Error as e:
-                await conn.rollback()
-                raise HTTPException(status_code=500, detail=f"数据库操作失败: {e}")
+    if characters_cache.item(character_id) is None:
+        raise HTTPException(status_code=404, detail="角色不存在")
+    await ingestor.sync_user(current_user)
+    if not ingestor.submit(current_user, character_id):
+        raise HTTPException(status_code=400, detail="您已经投过票了")
 
+    characters_cache.add_votes(character_id)
     return {"msg": "投票成功"}
+
+
+@router.post("/vote/batch", tags=["Vote"])
+async def vote_for_characters(request: BatchVoteRequest, current_user: str = Depends(get_current_user)):
+    """
+    一次为多个角色投票，逐个返回结果：accepted / already_voted / unknown。
+
+    已接受的投票进入同一个写入队列，在一个事务中批量写入数据库。
+    """
+    await ingestor.sync_user(current_user)
+    results = []
+    for character_id in request.character_ids:
+        if characters_cache.item(character_id) is None:
+            result = "unknown"
+        elif ingestor.submit(current_user, character_id):
+            characters_cache.add_votes(character_id)
+            result = "accepted"
+        else:
+            result = "already_voted"
+        results.append({"id": character_id, "result": result})
+    return {"results": results}
+
+
+@router.get("/vote/export", tags=["Vote"])
+async def export_votes(
+    table: Literal["votes", "totals"] = Query("votes", description="votes: 投票记录；totals: 各角色票数"),
+    export_format: Literal["csv", "parquet"] = Query("csv", alias="format"),
+    current_user: str = Depends(get_current_user),
+):
+    """导出投票数据（附带角色名称），仅限配置中 vote.export_admins 列出的用户"""
+    settings = get_settings().vote
+    if current_user not in settings.export_admins:
+        raise HTTPException(status_code=403, detail="没有导出权限")
+
+    # 先写入已接受但尚未落盘的投票，导出的快照才包含它们
+    await ingestor.flush()
+    exporter = export_csv if export_format == "csv" else export_parquet
+    media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/vnd.apache.parquet"
+    return StreamingResponse(
+        exporter(pool, table, list(CHARACTERS_DATA), settings.export_chunk_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'},
+    )
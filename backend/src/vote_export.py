@@ -0,0 +1,107 @@
+import asyncio
+import os
+import tempfile
+from typing import TYPE_CHECKING, AsyncIterator
+
+from .db import SQLitePool
+
+# Polars 的导入开销较大，只在导出时按需导入
+if TYPE_CHECKING:
+    import polars as pl
+
+# 表名 -> (查询, 列名)，按主键顺序读取，不需要额外排序
+EXPORT_QUERIES = {
+    "votes": (
+        "SELECT username, character_id FROM user_votes ORDER BY username, character_id",
+        ("username", "character_id"),
+    ),
+    "totals": (
+        "SELECT character_id, votes FROM character_votes ORDER BY character_id",
+        ("character_id", "votes"),
+    ),
+}
+
+
+async def _fetch_chunks(pool: SQLitePool, table: str, chunk_size: int) -> AsyncIterator[list[tuple]]:
+    """在独立的快照连接上按块读取，不占用读连接池，也不持有写锁"""
+    query, _ = EXPORT_QUERIES[table]
+    async with pool.snapshot() as conn:
+        conn.row_factory = None
+        async with conn.execute(query) as cursor:
+            while rows := await cursor.fetchmany(chunk_size):
+                yield rows
+
+
+def _to_frame(rows: list[tuple], table: str, characters: list[dict]) -> "pl.DataFrame":
+    """把一块数据转为 DataFrame，并按角色 ID 补充角色名称"""
+    import polars as pl
+
+    _, columns = EXPORT_QUERIES[table]
+    schema = {column: pl.String if column == "username" else pl.Int64 for column in columns}
+    df = pl.DataFrame(rows, schema=schema, orient="row")
+    names = {char["id"]: char["name"] for char in characters}
+    names_en = {char["id"]: char["name_en"] for char in characters}
+    character_id = pl.col("character_id")
+    return df.with_columns(
+        character_id.replace_strict(names, default=None, return_dtype=pl.String).alias("name"),
+        character_id.replace_strict(names_en, default=None, return_dtype=pl.String).alias("name_en"),
+    )
+
+
+def _csv_chunk(rows: list[tuple], table: str, characters: list[dict], header: bool) -> bytes:
+    return _to_frame(rows, table, characters).write_csv(include_header=header).encode("utf-8")
+
+
+async def export_csv(
+    pool: SQLitePool, table: str, characters: list[dict], chunk_size: int = 5000
+) -> AsyncIterator[bytes]:
+    """逐块生成 CSV，内存占用只与块大小有关"""
+    header = True
+    async for rows in _fetch_chunks(pool, table, chunk_size):
+        yield await asyncio.to_thread(_csv_chunk, rows, table, characters, header)
+        header = False
+    if header:
+        # 空表也要输出表头；第一次导出时 Polars 在这里才导入，同样放到线程中
+        yield await asyncio.to_thread(_csv_chunk, [], table, characters, header)
+
+
+def _write_part(rows: list[tuple], table: str, characters: list[dict], path: str):
+    _to_frame(rows, table, characters).write_parquet(path)
+
+
+def _merge_parts(directory: str, output: str):
+    import polars as pl
+
+    # 流式合并各块文件，文件名按序号补零，合并结果保持读取顺序
+    pl.scan_parquet(os.path.join(directory, "part-*.parquet")).sink_parquet(output)
+
+
+async def export_parquet(
+    pool: SQLitePool, table: str, characters: list[dict], chunk_size: int = 5000
+) -> AsyncIterator[bytes]:
+    """
+    生成 Parquet 文件并分块发送。
+
+    Parquet 的文件尾部要等所有数据写完才能确定，因此每块先写成临时文件，
+    再用 Polars 的流式引擎合并成一个文件，内存占用同样只与块大小有关。
+    """
+    with tempfile.TemporaryDirectory(prefix="zsim-export-") as directory:
+        parts = 0
+        async for rows in _fetch_chunks(pool, table, chunk_size):
+            path = os.path.join(directory, f"part-{parts:08d}.parquet")
+            await asyncio.to_thread(_write_part, rows, table, characters, path)
+            parts += 1
+        if parts == 0:
+            # 空表也写出一个只有表结构的文件
+            path = os.path.join(directory, "part-00000000.parquet")
+            await asyncio.to_thread(_write_part, [], table, characters, path)
+
+        output = os.path.join(directory, "export.parquet")
+        await asyncio.to_thread(_merge_parts, directory, output)
+        # 打开和读取文件都在线程中完成，不阻塞事件循环
+        f = await asyncio.to_thread(open, output, "rb")
+        try:
+            while chunk := await asyncio.to_thread(f.read, 1 << 16):
+                yield chunk
+        finally:
+            f.close()
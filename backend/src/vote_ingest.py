@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+import aiosqlite
+
+from .db import SQLitePool
+from .metrics import timed_query
+
+logger = logging.getLogger(__name__)
+
+# 单条 INSERT 语句中的最大行数，每行两个参数，远低于 SQLite 的参数数量上限
+INSERT_CHUNK_SIZE = 500
+
+
+class VoteIngestor:
+    """
+    写后投票入库管道。
+
+    投票请求只在内存中完成去重并进入队列，由后台任务每隔 flush_interval 秒
+    或积攒满 batch_size 票时，在一个事务里批量写入数据库（group commit）。
+    两次刷新之间，内存中的去重集合与票数是本进程的权威数据。
+
+    多进程部署时，其他进程接受的投票只出现在数据库中，接受投票前需先调用 sync_user
+    合并该用户在数据库中的记录，每个用户每 sync_ttl 秒最多读取一次；在此期间经其他进程
+    重复投的票仍会被接受，但写入时的 INSERT OR IGNORE 保证只计一次。
+    """
+
+    def __init__(self, pool: SQLitePool, flush_interval: float = 0.005, batch_size: int = 200, sync_ttl: float = 2):
+        self.pool = pool
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.sync_ttl = sync_ttl
+        self._voted: dict[str, set[int]] = {}
+        self._synced_at: dict[str, float] = {}
+        self._pending: list[tuple[str, int]] = []
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        """启动后台刷新任务；去重集合在用户投票时由 sync_user 按需加载"""
+        self._has_pending = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._voted = {}
+        self._synced_at = {}
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """停止后台任务，并把剩余的投票全部写入数据库"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @timed_query("vote", "sync_user_votes")
+    async def _load_user(self, username: str) -> list[int]:
+        async with self.pool.reader() as conn:
+            async with conn.execute("SELECT character_id FROM user_votes WHERE username = ?", (username,)) as cursor:
+                return [row[0] for row in await cursor.fetchall()]
+
+    async def sync_user(self, username: str) -> set[int]:
+        """
+        把用户在数据库中的投票记录（可能由其他工作进程写入）合并到去重集合，
+        返回该用户已投票的角色 ID，包含本进程尚未写入数据库的投票。
+
+        查询走 (username, character_id) 主键索引；距上次读取不足 sync_ttl 秒时直接使用内存中的集合。
+        """
+        voted = self._voted.setdefault(username, set())
+        now = time.monotonic()
+        synced_at = self._synced_at.get(username)
+        if synced_at is not None and now - synced_at < self.sync_ttl:
+            return voted
+        voted.update(await self._load_user(username))
+        self._synced_at[username] = now
+        return voted
+
+    @timed_query("vote", "user_votes_page")
+    async def user_votes_page(self, username: str, after: int, limit: int) -> list[int]:
+        """
+        按角色 ID 升序分页读取用户的投票记录（键集分页，从 after 之后开始）。
+
+        数据库查询走 (username, character_id) 主键索引；尚未写入的投票从队列中合并进来。
+        与 vote_counts 一样持有刷新锁，正在写入的批次不会从结果中消失。
+        """
+        async with self._flush_lock:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT character_id FROM user_votes WHERE username = ? AND character_id > ? "
+                    "ORDER BY character_id LIMIT ?",
+                    (username, after, limit),
+                ) as cursor:
+                    page = {row[0] for row in await cursor.fetchall()}
+            page.update(cid for name, cid in self._pending if name == username and cid > after)
+        return sorted(page)[:limit]
+
+    @timed_query("vote", "character_voters")
+    async def voter_count(self, character_id: int) -> int:
+        """
+        为该角色投票的用户数：数据库中的投票记录加上本进程尚未写入的投票。
+
+        计数走 (character_id, username) 索引，只扫描该角色的记录。
+        """
+        async with self._flush_lock:
+            async with self.pool.reader() as conn:
+                async with conn.execute(
+                    "SELECT COUNT(*) FROM user_votes WHERE character_id = ?", (character_id,)
+                ) as cursor:
+                    row = await cursor.fetchone()
+            return row[0] + sum(1 for _, cid in self._pending if cid == character_id)
+
+    def submit(self, username: str, character_id: int) -> bool:
+        """
+        提交一票，调用前应先 sync_user。
+
+        返回 False 表示该用户已经为此角色投过票；返回 True 表示投票已被接受，
+        将在下一次刷新时写入数据库。
+        """
+        voted = self._voted.setdefault(username, set())
+        if character_id in voted:
+            return False
+        voted.add(character_id)
+        self._pending.append((username, character_id))
+        self._has_pending.set()
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+        return True
+
+    async def flush(self):
+        """在一个事务中写入当前队列中的所有投票"""
+        async with self._flush_lock:
+            batch, self._pending = self._pending, []
+            self._has_pending.clear()
+            self._batch_full.clear()
+            if not batch:
+                return
+
+            try:
+                await self._write_batch(batch)
+            except BaseException:
+                # 写入失败或被取消时放回队首，等待下一轮重试或关闭时的最终刷新
+                self._pending[:0] = batch
+                self._has_pending.set()
+                raise
+
+    @timed_query("vote", "flush_votes")
+    async def _write_batch(self, batch: list[tuple[str, int]]):
+        async with self.pool.writer() as conn:
+            # 多进程部署时各进程的去重集合互不可见，同一用户可能经不同进程重复投票；
+            # 只为实际插入的投票记录计票，保证 character_votes 与 user_votes 一致
+            counts = Counter()
+            for start in range(0, len(batch), INSERT_CHUNK_SIZE):
+                chunk = batch[start : start + INSERT_CHUNK_SIZE]
+                placeholders = ",".join(["(?, ?)"] * len(chunk))
+                params = [value for row in chunk for value in row]
+                async with conn.execute(
+                    f"INSERT OR IGNORE INTO user_votes (username, character_id) VALUES {placeholders} "
+                    "RETURNING character_id",
+                    params,
+                ) as cursor:
+                    counts.update(row[0] for row in await cursor.fetchall())
+            await conn.executemany(
+                "INSERT INTO character_votes (character_id, votes) VALUES (?, ?) "
+                "ON CONFLICT(character_id) DO UPDATE SET votes = votes + excluded.votes",
+                counts.items(),
+            )
+
+    @timed_query("vote", "vote_counts")
+    async def vote_counts(self) -> dict[int, int]:
+        """
+        各角色的当前票数：数据库中的票数加上本进程尚未写入的投票。
+
+        持有刷新锁读取，避免把正在写入的批次漏算或重复计算。
+        """
+        async with self._flush_lock:
+            async with self.pool.reader() as conn:
+                async with conn.execute("SELECT character_id, votes FROM character_votes") as cursor:
+                    counts = {row["character_id"]: row["votes"] for row in await cursor.fetchall()}
+            for _, character_id in self._pending:
+                counts[character_id] = counts.get(character_id, 0) + 1
+        return counts
+
+    async def _run(self):
+        backoff = self.flush_interval
+        while True:
+            await self._has_pending.wait()
+            if len(self._pending) < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), self.flush_interval)
+                except TimeoutError:
+                    pass
+            try:
+                await self.flush()
+                backoff = self.flush_interval
+            except Exception as e:
+                # 任何错误都不能让刷新任务退出，否则已接受的投票会一直留在内存中
+                if isinstance(e, aiosqlite.Error):
+                    logger.warning("Failed to flush pending votes: %s", e, extra={"pending": len(self._pending)})
+                else:
+                    logger.exception("Unexpected error flushing pending votes", extra={"pending": len(self._pending)})
+                backoff = min(backoff * 2 or 0.05, 5.0)
+                await asyncio.sleep(backoff)
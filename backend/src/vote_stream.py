@@ -0,0 +1,128 @@
+import asyncio
+import json
+from typing import AsyncIterator, Callable
+
+
+class Subscriber:
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue[dict[int, int] | None] = asyncio.Queue(maxsize=max(1, buffer_size))
+        # 缓冲区溢出后置位，下一次发送改为完整快照，客户端据此重新对齐
+        self.lagged = False
+
+
+class VoteBroadcaster:
+    """
+    票数变化的推送广播。
+
+    publish 只记录每个角色的最新票数；后台任务每隔 window 秒把这段时间内的变化合并成一条消息，
+    发给所有订阅者。每个订阅者有一个有界缓冲区，消费过慢导致缓冲区写满时清空其积压，
+    并在下一次发送时改为推送完整快照，不会拖慢其他订阅者或无限占用内存。
+    """
+
+    def __init__(self, snapshot: Callable[[], dict[int, int]], window: float = 0.2, buffer_size: int = 64):
+        self.snapshot = snapshot
+        self.window = window
+        self.buffer_size = buffer_size
+        self.keepalive: float = 15
+        self._subscribers: set[Subscriber] = set()
+        self._changes: dict[int, int] = {}
+        self._has_changes = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+        self.messages_sent = 0
+        self.lagged_total = 0
+
+    async def start(self):
+        self._has_changes = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.close_streams()
+
+    def close_streams(self):
+        """通知所有连接结束，之后建立的连接发送快照后立即结束；服务器开始关闭时调用"""
+        self._closed = True
+        for subscriber in self._subscribers:
+            subscriber.lagged = False
+            self._clear(subscriber)
+            subscriber.queue.put_nowait(None)
+
+    def publish(self, votes: dict[int, int]):
+        """记录角色的最新票数，在下一个合并窗口推送"""
+        if not self._subscribers:
+            return
+        self._changes.update(votes)
+        self._has_changes.set()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "subscribers": len(self._subscribers),
+            "messages_sent": self.messages_sent,
+            "lagged": self.lagged_total,
+        }
+
+    @staticmethod
+    def _clear(subscriber: Subscriber):
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+
+    def _broadcast(self, changes: dict[int, int]):
+        for subscriber in self._subscribers:
+            if subscriber.lagged:
+                continue
+            try:
+                subscriber.queue.put_nowait(changes)
+                self.messages_sent += 1
+            except asyncio.QueueFull:
+                self._clear(subscriber)
+                subscriber.lagged = True
+                subscriber.queue.put_nowait({})  # 唤醒消费者，让它发送快照
+                self.lagged_total += 1
+
+    async def _run(self):
+        while True:
+            await self._has_changes.wait()
+            await asyncio.sleep(self.window)
+            changes, self._changes = self._changes, {}
+            self._has_changes.clear()
+            if changes:
+                self._broadcast(changes)
+
+    async def stream(self) -> AsyncIterator[str]:
+        """
+        一个 SSE 连接的事件流。
+
+        连接建立时先发送 snapshot 事件（全部角色票数），之后发送 votes 事件（只含变化的角色），
+        空闲时定期发送注释行保活。
+        """
+        subscriber = Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        try:
+            yield _event("snapshot", self.snapshot())
+            while not self._closed:
+                try:
+                    changes = await asyncio.wait_for(subscriber.queue.get(), self.keepalive)
+                except TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                if changes is None:
+                    return
+                if subscriber.lagged:
+                    subscriber.lagged = False
+                    yield _event("snapshot", self.snapshot())
+                else:
+                    yield _event("votes", changes)
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+def _event(name: str, votes: dict[int, int]) -> str:
+    return f"event: {name}\ndata: {json.dumps(votes, separators=(',', ':'))}\n\n"
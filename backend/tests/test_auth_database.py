@@ -0,0 +1,91 @@
+import asyncio
+
+import aiosqlite
+import pytest
+from backend.src import auth
+from backend.src.auth.database import AuthDatabase
+from fastapi import HTTPException
+
+
+def run_with_db(tmp_path, test):
+    async def main():
+        db = AuthDatabase(str(tmp_path / "auth.db"), read_pool_size=2)
+        await db.connect()
+        try:
+            await test(db)
+        finally:
+            await db.close()
+
+    asyncio.run(main())
+
+
+def test_concurrent_requests_consume_a_code_once(tmp_path):
+    async def test(db):
+        await db.store_code("a@example.com", "123456")
+
+        async def register(i: int) -> bool:
+            async with db.transaction() as tx:
+                if not await tx.consume_code("a@example.com", "123456"):
+                    return False
+                await tx.create_user(f"user{i}", "!", "a@example.com")
+                return True
+
+        results = await asyncio.gather(*(register(i) for i in range(8)))
+        assert results.count(True) == 1
+        assert await db.get_code("a@example.com") is None
+        user = await db.get_user_by_email("a@example.com")
+        assert user["username"] == f"user{results.index(True)}"
+
+    run_with_db(tmp_path, test)
+
+
+def test_failed_transaction_keeps_the_code(tmp_path):
+    async def test(db):
+        await db.store_code("a@example.com", "123456")
+        with pytest.raises(RuntimeError):
+            async with db.transaction() as tx:
+                assert await tx.consume_code("a@example.com", "123456")
+                raise RuntimeError("mail queue full")
+
+        assert (await db.get_code("a@example.com"))["code"] == "123456"
+        async with db.transaction() as tx:
+            assert not await tx.consume_code("a@example.com", "000000")
+
+    run_with_db(tmp_path, test)
+
+
+def test_email_login_reports_a_username_collision(tmp_path, monkeypatch):
+    async def test(db):
+        monkeypatch.setattr(auth, "db", db)
+        async with db.transaction() as tx:
+            await tx.create_user("a@example.com", "!", "b@example.com")
+        await db.store_code("a@example.com", "123456")
+
+        with pytest.raises(HTTPException) as excinfo:
+            await auth.login_with_email(auth.EmailLoginRequest(email="a@example.com", code="123456"))
+        assert excinfo.value.status_code == 409
+        # 失败的登录不消耗验证码
+        assert (await db.get_code("a@example.com"))["code"] == "123456"
+
+    run_with_db(tmp_path, test)
+
+
+@pytest.mark.parametrize("status_column, user_version", [(False, 0), (True, 0), (True, 1)])
+def test_migrations_add_the_code_status_column_once(tmp_path, status_column, user_version):
+    async def create_old_schema():
+        async with aiosqlite.connect(tmp_path / "auth.db") as conn:
+            status = ", status TEXT" if status_column else ""
+            await conn.execute(
+                f"CREATE TABLE verification_codes (email TEXT PRIMARY KEY, code TEXT, expire_time REAL{status})"
+            )
+            await conn.execute(f"PRAGMA user_version = {user_version}")
+            await conn.commit()
+
+    asyncio.run(create_old_schema())
+
+    async def test(db):
+        await db.store_code("a@example.com", "123456")
+        await db.set_code_status("a@example.com", "123456", "sent")
+        assert (await db.get_code("a@example.com"))["status"] == "sent"
+
+    run_with_db(tmp_path, test)
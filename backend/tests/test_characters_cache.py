@@ -0,0 +1,14 @@
+from backend.src.vote import CharactersCache
+
+
+def test_if_none_match_uses_weak_comparison():
+    cache = CharactersCache()
+    cache.items = [{"id": 1011, "votes": 3}]
+    etag = cache.etag
+
+    assert cache.not_modified(etag)
+    assert cache.not_modified(f"W/{etag}")
+    assert cache.not_modified(f'"stale", W/{etag}')
+    assert cache.not_modified("*")
+    assert not cache.not_modified('"stale"')
+    assert not cache.not_modified(None)
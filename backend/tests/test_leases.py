@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+from backend.src.character_details import SHARED_KEY, CharacterDetailsStore
+from backend.src.github.release_manifest import SHARED_KEY as MANIFEST_KEY
+from backend.src.github.release_manifest import ReleaseManifestStore
+from backend.src.shared_cache import SharedCache
+
+
+def run_with_cache(tmp_path, test):
+    async def main():
+        shared = SharedCache()
+        await shared.open(str(tmp_path / "cache.db"))
+        try:
+            await test(shared)
+        finally:
+            await shared.close()
+
+    asyncio.run(main())
+
+
+def test_shorten_only_moves_the_owners_lease_earlier(tmp_path):
+    async def test(shared):
+        assert await shared.claim("job", 3600, owner="a")
+        await shared.shorten("job", 0, owner="b")
+        assert not await shared.claim("job", 3600, owner="b")
+        await shared.shorten("job", 0, owner="a")
+        assert await shared.claim("job", 3600, owner="b")
+        # 缩短不会延长已有的租约
+        await shared.shorten("job", 7200, owner="b")
+        assert not await shared.claim("job", 3600, owner="a")
+
+    run_with_cache(tmp_path, test)
+
+
+def test_failed_character_refresh_retries_with_backoff(tmp_path, monkeypatch):
+    store = CharacterDetailsStore(
+        SharedCache(), str(tmp_path / "character.parquet"), retry_backoff=0.05, max_retry_backoff=0.1
+    )
+    attempts = 0
+
+    async def failing_refresh():
+        nonlocal attempts
+        attempts += 1
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(store, "refresh", failing_refresh)
+
+    async def test(shared):
+        store.shared = shared
+        for expected_delay in (0.05, 0.1, 0.1):
+            with pytest.raises(RuntimeError):
+                await store.sync()
+            # 租约没有占满 refresh_interval，退避结束后即可再次获取
+            await asyncio.sleep(expected_delay - 0.03)
+            assert not await shared.claim(SHARED_KEY, 3600, owner="other")
+            await asyncio.sleep(0.05)
+        assert attempts == 3
+
+    run_with_cache(tmp_path, test)
+
+
+def test_failed_manifest_refresh_releases_the_lease_early(tmp_path, monkeypatch):
+    store = ReleaseManifestStore(SharedCache(), str(tmp_path / "releases.json"), retry_backoff=0.05)
+
+    async def failing_refresh():
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(store, "refresh", failing_refresh)
+
+    async def test(shared):
+        store.shared = shared
+        with pytest.raises(RuntimeError):
+            await store.sync()
+        assert not await shared.claim(MANIFEST_KEY, 3600, owner="other")
+        await asyncio.sleep(0.07)
+        assert await shared.claim(MANIFEST_KEY, 3600, owner="other")
+
+    run_with_cache(tmp_path, test)
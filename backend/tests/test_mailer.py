@@ -0,0 +1,47 @@
+import asyncio
+
+from backend.bench.stubs import SMTPSink, start_smtp_sink
+from backend.src.auth.mailer import MailDispatcher
+from backend.src.settings import EmailConfig
+
+
+def test_dispatcher_reports_sent_and_refused_mail(monkeypatch):
+    monkeypatch.setattr(SMTPSink, "refused", {b"nobody@example.com"})
+    statuses = {}
+
+    async def main():
+        server = await start_smtp_sink(0)
+        done = asyncio.Event()
+
+        async def on_status(to_email: str, tag: str, status: str):
+            statuses[tag] = (to_email, status)
+            if len(statuses) == 2:
+                done.set()
+
+        config = EmailConfig(
+            smtp_host="127.0.0.1",
+            smtp_port=server.sockets[0].getsockname()[1],
+            smtp_username="",
+            smtp_password="",
+            smtp_from="zsim@example.com",
+            send_real_email=True,
+            smtp_ssl=False,
+            workers=1,
+            retry_backoff=30,
+        )
+        dispatcher = MailDispatcher(config, on_status)
+        await dispatcher.start()
+        try:
+            dispatcher.submit("nobody@example.com", "ZSim验证码", "<div>1</div>", tag="1")
+            dispatcher.submit("alice@example.com", "ZSim验证码", "<div>2</div>", tag="2")
+            # 被拒收的邮件不重试（否则要等待 retry_backoff），同一会话继续发送下一封
+            await asyncio.wait_for(done.wait(), 5)
+        finally:
+            await dispatcher.stop()
+            server.close()
+            await server.wait_closed()
+        return dispatcher
+
+    dispatcher = asyncio.run(main())
+    assert statuses == {"1": ("nobody@example.com", "failed"), "2": ("alice@example.com", "sent")}
+    assert (dispatcher.sent, dispatcher.failed) == (1, 1)
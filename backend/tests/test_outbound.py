@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import pytest
+from backend.src.outbound import CircuitOpenError, outbound
+from backend.src.settings import OutboundSettings
+
+URL = "https://upstream.test/data"
+
+
+def run_outbound(handler, test, **settings):
+    async def main():
+        await outbound.start(
+            OutboundSettings(retry_backoff=0.001, max_retry_backoff=0.001, **settings),
+            transport=httpx.MockTransport(handler),
+        )
+        try:
+            await test()
+        finally:
+            await outbound.stop()
+
+    asyncio.run(main())
+
+
+def test_connection_errors_are_raised_after_retries():
+    attempts = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        raise httpx.ConnectError("refused", request=request)
+
+    async def test():
+        with pytest.raises(httpx.ConnectError):
+            await outbound.get(URL)
+        assert attempts == 3
+
+    run_outbound(handler, test, max_retries=2)
+
+
+def test_breaker_opens_probes_and_closes():
+    attempts = 0
+    healthy = False
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        return httpx.Response(200 if healthy else 503)
+
+    async def test():
+        nonlocal healthy
+        breaker = outbound.breaker("upstream.test")
+
+        # 重试用尽后返回最后一次的响应，连续失败达到阈值后熔断
+        assert (await outbound.get(URL)).status_code == 503
+        assert attempts == 3
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            await outbound.get(URL)
+        assert attempts == 3
+
+        # 半开时只放行一个试探请求，失败后重新熔断
+        await asyncio.sleep(0.06)
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            await outbound.get(URL)
+        assert attempts == 4
+        assert breaker.state == "open"
+
+        # 试探成功后关闭
+        await asyncio.sleep(0.06)
+        healthy = True
+        assert (await outbound.get(URL)).status_code == 200
+        assert attempts == 5
+        assert breaker.state == "closed"
+
+    run_outbound(handler, test, max_retries=2, breaker_threshold=3, breaker_reset=0.05)
@@ -0,0 +1,31 @@
+import asyncio
+
+from backend.src.auth import passwords
+from backend.src.auth.passwords import UNUSABLE_PASSWORD, PasswordHasher
+from backend.src.settings import PasswordSettings
+
+
+def test_verify_without_usable_hash_still_runs_scrypt(monkeypatch):
+    verified = []
+    verify_sync = passwords._verify_sync
+
+    def recording_verify(password, stored, settings):
+        verified.append(stored)
+        return verify_sync(password, stored, settings)
+
+    monkeypatch.setattr(passwords, "_verify_sync", recording_verify)
+
+    async def main():
+        hasher = PasswordHasher()
+        await hasher.start(PasswordSettings(scrypt_n=1024))
+        try:
+            stored = await hasher.hash("secret")
+            assert await hasher.verify("secret", stored) == (True, False)
+            assert await hasher.verify("secret", None) == (False, False)
+            assert await hasher.verify("secret", UNUSABLE_PASSWORD) == (False, False)
+        finally:
+            hasher.stop()
+
+    asyncio.run(main())
+    assert len(verified) == 3
+    assert all(stored.startswith("scrypt$1024$") for stored in verified)
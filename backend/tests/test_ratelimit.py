@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+from backend import src
+from backend.src import auth
+from backend.src.ratelimit import RateLimitRule, TokenBucketLimiter, hit_all
+from backend.src.settings import RateLimitSettings
+from fastapi import HTTPException, Request
+
+
+@pytest.fixture
+def limiters(monkeypatch):
+    limiters = {
+        "total": TokenBucketLimiter(RateLimitRule(capacity=50, period=10), max_keys=1),
+        "ip": TokenBucketLimiter(RateLimitRule(capacity=10, period=600)),
+        "email": TokenBucketLimiter(RateLimitRule(capacity=3, period=900)),
+    }
+    monkeypatch.setattr(auth, "send_code_limiters", limiters)
+    return limiters
+
+
+def send(email: str, ip: str) -> int:
+    try:
+        auth.check_send_code_rate(email, ip)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def test_hit_all_consumes_nothing_when_any_limiter_rejects():
+    first = TokenBucketLimiter(RateLimitRule(capacity=5, period=60))
+    second = TokenBucketLimiter(RateLimitRule(capacity=1, period=60))
+
+    assert hit_all([(first, "k"), (second, "k")]) == 0
+    assert hit_all([(first, "k"), (second, "k")]) > 0
+    # 第二个限流器拒绝时，第一个的令牌没有被消耗
+    assert first.peek("k") == 0
+    assert first.stats() == {"keys": 1, "allowed": 1, "rejected": 0}
+    assert second.stats() == {"keys": 1, "allowed": 1, "rejected": 1}
+
+
+def test_requests_rejected_per_ip_do_not_use_the_global_budget(limiters):
+    statuses = [send(f"user{i}@example.com", "10.0.0.1") for i in range(60)]
+    assert statuses.count(200) == 10
+    assert statuses.count(429) == 50
+
+    # 被 IP 限流器拒绝的请求没有消耗总量，其他客户端仍能发送
+    assert send("other@example.com", "10.0.0.2") == 200
+    assert limiters["total"].stats()["allowed"] == 11
+    assert limiters["total"].stats()["rejected"] == 0
+
+
+def test_requests_rejected_per_email_do_not_use_the_ip_budget(limiters):
+    statuses = [send("victim@example.com", "10.0.0.1") for _ in range(5)]
+    assert statuses == [200, 200, 200, 429, 429]
+    assert limiters["ip"].stats()["allowed"] == 3
+
+    # 同一 IP 换一个邮箱时，剩余的 IP 额度没有被之前被拒绝的请求占用
+    statuses = [send(f"user{i}@example.com", "10.0.0.1") for i in range(8)]
+    assert statuses.count(200) == 7
+
+
+def test_global_budget_still_applies(limiters):
+    statuses = [send(f"user{i}@example.com", f"10.0.{i}.1") for i in range(51)]
+    assert statuses.count(200) == 50
+    assert statuses[-1] == 429
+
+
+def forwarded_request(*headers: str) -> Request:
+    return Request(
+        {
+            "type": "http",
+            "headers": [(b"x-forwarded-for", header.encode()) for header in headers],
+            "client": ("10.0.0.2", 50000),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    ("trusted_proxies", "headers", "expected"),
+    [
+        # 客户端伪造的条目在左侧，受信任的代理把真实地址追加在最右侧
+        (1, ["6.6.6.6, 203.0.113.7"], "203.0.113.7"),
+        (1, ["6.6.6.6", "203.0.113.7"], "203.0.113.7"),
+        (2, ["6.6.6.6, 203.0.113.7, 10.0.0.1"], "203.0.113.7"),
+        (3, ["203.0.113.7"], "203.0.113.7"),
+    ],
+)
+def test_client_ip_ignores_spoofed_forwarded_for_entries(monkeypatch, trusted_proxies, headers, expected):
+    settings = RateLimitSettings(trust_forwarded_for=True, trusted_proxies=trusted_proxies)
+    monkeypatch.setattr(src, "get_settings", lambda: SimpleNamespace(rate_limit=settings))
+    assert src.client_ip(forwarded_request(*headers)) == expected
+
+
+def test_client_ip_ignores_forwarded_for_unless_trusted(monkeypatch):
+    monkeypatch.setattr(src, "get_settings", lambda: SimpleNamespace(rate_limit=RateLimitSettings()))
+    assert src.client_ip(forwarded_request("6.6.6.6")) == "10.0.0.2"
@@ -0,0 +1,33 @@
+import asyncio
+import json
+
+import httpx
+from backend.src.github.release_manifest import ReleaseManifestStore
+from backend.src.outbound import outbound
+from backend.src.settings import OutboundSettings
+from backend.src.shared_cache import SharedCache
+
+
+def test_not_modified_refresh_updates_fetched_at(tmp_path):
+    path = tmp_path / "releases.json"
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(304)
+
+    async def main():
+        await outbound.start(OutboundSettings(max_retries=0), transport=httpx.MockTransport(handler))
+        try:
+            store = ReleaseManifestStore(SharedCache(), str(path))
+            store.manifest = {"fetched_at": 1, "etag": '"v1"', "channels": {}, "releases": []}
+            assert await store.refresh()
+            return store.manifest
+        finally:
+            await outbound.stop()
+
+    manifest = asyncio.run(main())
+    assert requests[0].headers["If-None-Match"] == '"v1"'
+    assert manifest["fetched_at"] > 1
+    assert manifest["etag"] == '"v1"'
+    assert json.loads(path.read_text(encoding="utf-8")) == manifest
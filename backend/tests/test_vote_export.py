@@ -0,0 +1,42 @@
+import asyncio
+import io
+
+import polars as pl
+from backend.src.db import SQLitePool
+from backend.src.vote_export import export_csv, export_parquet
+
+CHARACTERS = [{"id": 1011, "name": "安比", "name_en": "Anby"}]
+
+
+def run_export(tmp_path, export, votes: list[tuple[str, int]]) -> bytes:
+    async def main():
+        pool = SQLitePool()
+        await pool.open(str(tmp_path / f"{export.__name__}.db"), 1)
+        try:
+            async with pool.writer() as conn:
+                await conn.execute(
+                    "CREATE TABLE user_votes (username TEXT NOT NULL, character_id INTEGER NOT NULL, "
+                    "PRIMARY KEY (username, character_id))"
+                )
+                await conn.executemany("INSERT INTO user_votes VALUES (?, ?)", votes)
+            return b"".join([chunk async for chunk in export(pool, "votes", CHARACTERS, chunk_size=1)])
+        finally:
+            await pool.close()
+
+    return asyncio.run(main())
+
+
+def test_export_empty_table(tmp_path):
+    assert run_export(tmp_path, export_csv, []) == b"username,character_id,name,name_en\n"
+    df = pl.read_parquet(io.BytesIO(run_export(tmp_path, export_parquet, [])))
+    assert df.columns == ["username", "character_id", "name", "name_en"]
+    assert df.height == 0
+
+
+def test_export_keeps_row_order_across_chunks(tmp_path):
+    votes = [("alice", 1011), ("bob", 1011), ("bob", 9999)]
+    expected = [("alice", 1011, "安比", "Anby"), ("bob", 1011, "安比", "Anby"), ("bob", 9999, None, None)]
+    df = pl.read_csv(io.BytesIO(run_export(tmp_path, export_csv, votes)))
+    assert df.rows() == expected
+    df = pl.read_parquet(io.BytesIO(run_export(tmp_path, export_parquet, votes)))
+    assert df.rows() == expected
@@ -0,0 +1,144 @@
+import asyncio
+
+from backend.src.db import SQLitePool
+from backend.src.vote_ingest import VoteIngestor
+
+
+async def open_ingestor(db_path: str, flush_interval: float) -> VoteIngestor:
+    pool = SQLitePool()
+    await pool.open(db_path, 1)
+    async with pool.writer() as conn:
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS character_votes (character_id INTEGER PRIMARY KEY, votes INTEGER NOT NULL DEFAULT 0)"
+        )
+        await conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_votes (username TEXT NOT NULL, character_id INTEGER NOT NULL, "
+            "PRIMARY KEY (username, character_id))"
+        )
+    ingestor = VoteIngestor(pool, flush_interval=flush_interval)
+    await ingestor.start()
+    return ingestor
+
+
+async def close_ingestor(ingestor: VoteIngestor):
+    await ingestor.stop()
+    await ingestor.pool.close()
+
+
+def run_workers(tmp_path, test, count: int = 2, flush_interval: float = 60):
+    """在同一个数据库上启动 count 个 VoteIngestor，模拟多个工作进程；默认不会自动刷新，由测试调用 flush"""
+
+    async def main():
+        workers = [await open_ingestor(str(tmp_path / "vote.db"), flush_interval) for _ in range(count)]
+        try:
+            await test(*workers)
+        finally:
+            for worker in workers:
+                await close_ingestor(worker)
+
+    asyncio.run(main())
+
+
+def test_flush_writes_each_accepted_vote_once(tmp_path):
+    async def test(worker):
+        await worker.sync_user("alice")
+        assert worker.submit("alice", 1)
+        assert not worker.submit("alice", 1)
+        assert worker.submit("alice", 2)
+        assert worker.submit("bob", 1)
+        assert await worker.vote_counts() == {1: 2, 2: 1}
+
+        await worker.flush()
+        assert worker.pending == 0
+        assert await worker.vote_counts() == {1: 2, 2: 1}
+        assert await worker.user_votes_page("alice", 0, 10) == [1, 2]
+
+    run_workers(tmp_path, test, count=1)
+
+
+def test_vote_accepted_by_another_worker_is_rejected(tmp_path):
+    async def test(worker_a, worker_b):
+        await worker_a.sync_user("alice")
+        assert worker_a.submit("alice", 1)
+        await worker_a.flush()
+
+        assert await worker_b.sync_user("alice") == {1}
+        assert not worker_b.submit("alice", 1)
+        assert worker_b.submit("alice", 2)
+
+    run_workers(tmp_path, test)
+
+
+def test_concurrent_votes_on_two_workers_are_counted_once(tmp_path):
+    async def test(worker_a, worker_b):
+        # 两个进程在任一方落盘前都接受了同一票
+        for worker in (worker_a, worker_b):
+            await worker.sync_user("alice")
+            assert worker.submit("alice", 1)
+        await worker_a.flush()
+        await worker_b.flush()
+
+        assert await worker_a.vote_counts() == {1: 1}
+        assert await worker_b.voter_count(1) == 1
+
+    run_workers(tmp_path, test)
+
+
+def test_flush_loop_survives_unexpected_errors(tmp_path, monkeypatch):
+    async def test(worker):
+        write_batch = worker._write_batch
+        failures = 0
+
+        async def flaky_write_batch(batch):
+            nonlocal failures
+            if failures == 0:
+                failures += 1
+                raise ValueError("boom")
+            await write_batch(batch)
+
+        monkeypatch.setattr(worker, "_write_batch", flaky_write_batch)
+        await worker.sync_user("alice")
+        worker.submit("alice", 1)
+        for _ in range(100):
+            if worker.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+
+        assert failures == 1
+        assert worker.pending == 0
+        assert await worker.voter_count(1) == 1
+
+    run_workers(tmp_path, test, count=1, flush_interval=0.001)
+
+
+def test_history_includes_votes_of_a_flush_in_progress(tmp_path):
+    async def test(worker):
+        await worker.sync_user("alice")
+        worker.submit("alice", 1011)
+        worker.submit("alice", 1021)
+        flushing = asyncio.create_task(worker.flush())
+        # 让刷新任务取出队列、开始写入，但尚未提交
+        await asyncio.sleep(0)
+        assert worker.pending == 0
+        assert await worker.user_votes_page("alice", 0, 10) == [1011, 1021]
+        await flushing
+        assert await worker.user_votes_page("alice", 0, 10) == [1011, 1021]
+
+    run_workers(tmp_path, test, count=1)
+
+
+def test_sync_user_reads_the_database_once_per_ttl(tmp_path):
+    async def test(worker_a, worker_b):
+        worker_b.sync_ttl = 0.05
+        assert await worker_b.sync_user("alice") == set()
+        await worker_a.sync_user("alice")
+        worker_a.submit("alice", 1)
+        await worker_a.flush()
+
+        # 有效期内使用内存中的集合，不再查询数据库
+        assert await worker_b.sync_user("alice") == set()
+        await asyncio.sleep(0.06)
+        assert await worker_b.sync_user("alice") == {1}
+        assert not worker_b.submit("alice", 1)
+
+    run_workers(tmp_path, test)
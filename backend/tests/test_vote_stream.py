@@ -0,0 +1,48 @@
+import asyncio
+import signal
+
+from backend.src.shutdown import on_shutdown_signal
+from backend.src.vote_stream import VoteBroadcaster
+
+
+def test_close_streams_ends_open_and_new_streams():
+    async def main():
+        broadcaster = VoteBroadcaster(lambda: {1: 0}, window=0.001)
+        await broadcaster.start()
+        stream = broadcaster.stream()
+        assert (await anext(stream)).startswith("event: snapshot")
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.01)
+
+        broadcaster.close_streams()
+        try:
+            await asyncio.wait_for(pending, 1)
+        except StopAsyncIteration:
+            pass
+        else:
+            raise AssertionError("stream did not end")
+        assert broadcaster.stats()["subscribers"] == 0
+        # 关闭后建立的连接只收到快照
+        assert [event async for event in broadcaster.stream()] == ['event: snapshot\ndata: {"1":0}\n\n']
+        await broadcaster.stop()
+
+    asyncio.run(main())
+
+
+def test_shutdown_signal_runs_callback_and_previous_handler():
+    received = []
+    original_int = signal.getsignal(signal.SIGINT)
+    original_term = signal.signal(signal.SIGTERM, lambda signum, frame: received.append(signum))
+    try:
+
+        async def main():
+            closed = asyncio.Event()
+            on_shutdown_signal(closed.set)
+            signal.raise_signal(signal.SIGTERM)
+            await asyncio.wait_for(closed.wait(), 1)
+
+        asyncio.run(main())
+    finally:
+        signal.signal(signal.SIGTERM, original_term)
+        signal.signal(signal.SIGINT, original_int)
+    assert received == [signal.SIGTERM]